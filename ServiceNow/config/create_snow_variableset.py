@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
 import os
 import json
-import hcl2
 import requests
 import argparse
 import time
 from pathlib import Path
 import sys
 
+# Shared variables.tf / terraform.tfvars parser (with on-disk cache)
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "python_scripts"))
+import hcl_vars
+
 # -------------------
 # Parse CLI arguments
 # -------------------
@@ -105,25 +108,6 @@ headers = {
     "Content-Type": "application/json",
 }
 
-# -------------------
-# Parse variables.tf
-# -------------------
-def parse_variables_tf(path):
-    with open(path, "r") as f:
-        data = hcl2.load(f)
-    variables = {}
-    for var in data.get("variable", []):
-        for name, attrs in var.items():
-            variables[name] = attrs
-    return variables
-
-# -------------------
-# Parse terraform.tfvars
-# -------------------
-def parse_tfvars(path):
-    with open(path, "r") as f:
-        return hcl2.load(f)
-
 # -------------------
 # Create or get variable set
 # -------------------
@@ -156,12 +140,14 @@ def get_or_create_variable_set():
 # -------------------
 # Create variable
 # -------------------
-def create_variable(varset_sys_id, name, attrs, tfvars_defaults):
+def create_variable(varset_sys_id, var):
+    name = var.name
     tf_name = f"tf_var_{name}"  # no u_ prefix
-    question_text = attrs.get("description", name)
-    var_type = attrs.get("type", "string")
-    default_value = tfvars_defaults.get(name, attrs.get("default"))
-    mask_type = "password" if any(x in name.lower() for x in ["password", "token", "secret"]) else None
+    question_text = var.description or name
+    var_type = var.type or "string"
+    default_value = var.value  # terraform.tfvars, else the variable's default
+    sensitive = var.sensitive or any(x in name.lower() for x in ["password", "token", "secret"])
+    mask_type = "password" if sensitive else None
 
     payload = {
         "name": tf_name,
@@ -171,7 +157,7 @@ def create_variable(varset_sys_id, name, attrs, tfvars_defaults):
     }
     if default_value is not None:
         payload["default_value"] = (
-            json.dumps(default_value) if isinstance(default_value, list) else str(default_value)
+            json.dumps(default_value) if isinstance(default_value, (list, dict)) else str(default_value)
         )
     if mask_type:
         payload["mask_type"] = mask_type
@@ -199,17 +185,16 @@ def create_variable(varset_sys_id, name, attrs, tfvars_defaults):
 # MAIN
 # -------------------
 if __name__ == "__main__":
-    print("Parsing Terraform variable definitions...")
-    variables = parse_variables_tf(VARIABLES_FILE)
-
-    print("Parsing Terraform tfvars...")
-    tfvars_defaults = parse_tfvars(TFVARS_FILE)
+    print("Parsing Terraform variable definitions and tfvars...")
+    variables = hcl_vars.apply_tfvars(
+        hcl_vars.read_variables(VARIABLES_FILE), hcl_vars.read_tfvars(TFVARS_FILE)
+    )
 
     print("Ensuring variable set exists...")
     varset_sys_id = get_or_create_variable_set()
 
     print("Creating variables...")
-    for name, attrs in variables.items():
-        create_variable(varset_sys_id, name, attrs, tfvars_defaults)
+    for var in variables:
+        create_variable(varset_sys_id, var)
 
     print("Done! All variables synced to ServiceNow.")
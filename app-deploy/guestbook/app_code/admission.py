@@ -0,0 +1,131 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+class Overloaded(Exception):
+    """Raised when a request can't be admitted within the queue timeout."""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimited(Exception):
+    """Raised when a client has used up its token bucket."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """Caps the requests a process works on at once.
+
+    Up to ``max_in_flight`` requests run; the next ``max_queue`` wait up to
+    ``queue_timeout`` seconds for a slot and anything beyond that is shed
+    straight away, so a burst turns into fast 503s instead of a pile-up on
+    the DB pool. ``max_in_flight=0`` disables the limit.
+    """
+
+    def __init__(self, max_in_flight=0, max_queue=16, queue_timeout=2.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.timed_out = 0
+
+    def acquire(self):
+        with self._cond:
+            if not self.max_in_flight or self._in_flight < self.max_in_flight:
+                self._in_flight += 1
+                self.admitted += 1
+                return
+            if self._waiting >= self.max_queue:
+                self.shed += 1
+                raise Overloaded(f"{self._in_flight} requests in flight, queue full")
+            self.queued += 1
+            self._waiting += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self._in_flight >= self.max_in_flight:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timed_out += 1
+                        raise Overloaded(f"no request slot within {self.queue_timeout}s")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+            self.admitted += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "max_in_flight": self.max_in_flight,
+                "in_flight": self._in_flight,
+                "waiting": self._waiting,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "shed": self.shed,
+                "timed_out": self.timed_out,
+            }
+
+
+class RateLimiter:
+    """Per-client token buckets: ``rate`` tokens per second, ``burst`` deep.
+
+    Buckets live in an LRU capped at ``max_clients``; a client evicted from
+    it simply starts again with a full bucket. ``rate=0`` disables limiting.
+    """
+
+    def __init__(self, rate=0.0, burst=5, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client -> (tokens, updated_at)
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, client):
+        """Take a token for ``client`` or raise RateLimited."""
+        if not self.rate:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                self.allowed += 1
+                wait = 0
+            else:
+                self.limited += 1
+                wait = (1 - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        if wait:
+            raise RateLimited(f"rate limit exceeded for {client}", math.ceil(wait))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "clients": len(self._buckets),
+                "allowed": self.allowed,
+                "limited": self.limited,
+            }
@@ -1,31 +1,418 @@
+import time
+_import_started = time.perf_counter()
+
+import json
 import os
-import mysql.connector
-from flask import Flask, request, redirect, url_for, render_template
-from cryptography import x509
-from cryptography.hazmat.backends import default_backend
+import tempfile
+from datetime import datetime, timezone
+from functools import partial
+from flask import (Flask, Response, request, redirect, url_for, render_template,
+                   jsonify, make_response, g, stream_with_context)
+
+import metrics
+from db_pool import ConnectionPool, PoolTimeout, ReadRouter
+from file_cache import FileCache
+from write_queue import WriteBehindQueue, QueueFull
+from page_cache import PageCache
+from compression import compress_response
+from admission import AdmissionLimiter, Overloaded, RateLimiter, RateLimited
+from health import HealthChecker
+from feed import EntryFeed, SharedPoll
+
+# mysql.connector and cryptography are imported where they are used: the
+# first connection and the first cert parse. server.py imports them once
+# before forking, so workers don't pay for them either way.
+IMPORT_SECONDS = time.perf_counter() - _import_started
 
 # ─── Config from Secrets ─────────────────────────────────────────────
 DB_HOST   = os.environ.get("DB_HOST", "mysql")
-DB_NAME   = os.environ["DB_NAME"]
+DB_PORT   = int(os.environ.get("DB_PORT", "3306"))
+DB_NAME   = os.environ.get("DB_NAME", "")  # required; checked by preflight.py
 #MESSAGE   = os.environ.get("MESSAGE", "Welcome to the Guestbook!")
-CERT_FILE = "/tls/tls.crt"
-KEY_FILE  = "/tls/tls.key"
+TLS_DIR   = os.environ.get("TLS_DIR", "/tls")
+CERT_FILE = os.path.join(TLS_DIR, "tls.crt")
+KEY_FILE  = os.path.join(TLS_DIR, "tls.key")
+SECRETS_DIR  = os.environ.get("SECRETS_DIR", "/secrets")
+DB_USER_FILE = os.path.join(SECRETS_DIR, "db", "username")
+DB_PASS_FILE = os.path.join(SECRETS_DIR, "db", "password")
+CONFIG_DIR   = os.path.join(SECRETS_DIR, "config")
+FILE_CACHE_CHECK_INTERVAL = float(os.environ.get("FILE_CACHE_CHECK_INTERVAL", "1"))
 
-def get_db_creds():
-    user = open("/secrets/db/username").read().strip()
-    pwd  = open("/secrets/db/password").read().strip()
+# ─── Connection pool ─────────────────────────────────────────────────
+DB_POOL_SIZE         = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_POOL_MAX_OVERFLOW = int(os.environ.get("DB_POOL_MAX_OVERFLOW", "5"))
+DB_POOL_IDLE_TIMEOUT = float(os.environ.get("DB_POOL_IDLE_TIMEOUT", "300"))
+DB_POOL_TIMEOUT      = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+
+def read_db_creds():
+    user = open(DB_USER_FILE).read().strip()
+    pwd  = open(DB_PASS_FILE).read().strip()
     return user, pwd
 
-def get_connection():
-    user, pwd = get_db_creds()
+creds_cache = FileCache(
+    "db_creds", [DB_USER_FILE, DB_PASS_FILE], metrics.timed("read_creds", read_db_creds),
+    check_interval=FILE_CACHE_CHECK_INTERVAL,
+)
+
+def get_db_creds():
+    return creds_cache.get()
+
+def open_connection(user, pwd, host=DB_HOST):
+    import mysql.connector
     return mysql.connector.connect(
-        host=DB_HOST,
+        host=host,
+        port=DB_PORT,
         database=DB_NAME,
         user=user,
-        password=pwd
-    ), user, pwd
+        password=pwd,
+        autocommit=True
+    )
+
+db_pool = ConnectionPool(
+    open_connection,
+    get_db_creds,
+    size=DB_POOL_SIZE,
+    max_overflow=DB_POOL_MAX_OVERFLOW,
+    idle_timeout=DB_POOL_IDLE_TIMEOUT,
+    timeout=DB_POOL_TIMEOUT,
+    on_checkout=partial(metrics.observe_phase, "db_connect"),
+)
+
+# ─── Read replicas ───────────────────────────────────────────────────
+# Optional comma-separated replica hosts for the listing queries. Writes
+# always go to DB_HOST; a client that just POSTed reads from DB_HOST too
+# for READ_YOUR_WRITES_SECONDS so it sees its own entry.
+DB_READ_HOSTS            = [h.strip() for h in os.environ.get("DB_READ_HOSTS", "").split(",") if h.strip()]
+DB_READ_STRATEGY         = os.environ.get("DB_READ_STRATEGY", "round_robin")
+DB_READ_CHECK_INTERVAL   = float(os.environ.get("DB_READ_CHECK_INTERVAL", "5"))
+READ_YOUR_WRITES_SECONDS = int(os.environ.get("READ_YOUR_WRITES_SECONDS", "5"))
+READ_PRIMARY_COOKIE      = "gb_read_primary"
+
+read_router = ReadRouter(
+    db_pool,
+    {
+        host: ConnectionPool(
+            partial(open_connection, host=host),
+            get_db_creds,
+            size=DB_POOL_SIZE,
+            max_overflow=DB_POOL_MAX_OVERFLOW,
+            idle_timeout=DB_POOL_IDLE_TIMEOUT,
+            timeout=DB_POOL_TIMEOUT,
+            on_checkout=partial(metrics.observe_phase, "db_connect"),
+        )
+        for host in DB_READ_HOSTS
+    },
+    strategy=DB_READ_STRATEGY,
+    check_interval=DB_READ_CHECK_INTERVAL,
+)
+
+def read_from_primary(req):
+    try:
+        return float(req.cookies.get(READ_PRIMARY_COOKIE, "0")) > time.time()
+    except ValueError:
+        return False
+
+# ─── Write-behind queue ──────────────────────────────────────────────
+# Optional: queue POSTed entries and insert them in multi-row batches.
+WRITE_BEHIND        = os.environ.get("WRITE_BEHIND", "0") == "1"
+WRITE_BATCH_SIZE    = int(os.environ.get("WRITE_BATCH_SIZE", "100"))
+WRITE_MAX_DELAY     = float(os.environ.get("WRITE_MAX_DELAY", "0.5"))
+WRITE_QUEUE_SIZE    = int(os.environ.get("WRITE_QUEUE_SIZE", "1000"))
+WRITE_QUEUE_TIMEOUT = float(os.environ.get("WRITE_QUEUE_TIMEOUT", "0.5"))
+
+def insert_entries(rows):
+    with db_pool.connection() as conn:
+        cur = conn.cursor()
+        # executemany() rewrites this into a single multi-row INSERT.
+        cur.executemany(
+            "INSERT INTO guestbook (name,message) VALUES (%s,%s)",
+            rows
+        )
+        cur.close()
+    page_cache.bump()
+    feed.notify()
+
+write_queue = WriteBehindQueue(
+    insert_entries,
+    max_batch=WRITE_BATCH_SIZE,
+    max_delay=WRITE_MAX_DELAY,
+    max_queue=WRITE_QUEUE_SIZE,
+    put_timeout=WRITE_QUEUE_TIMEOUT,
+)
+
+# ─── Rendered-page cache ─────────────────────────────────────────────
+PAGE_CACHE         = os.environ.get("PAGE_CACHE", "1") == "1"
+PAGE_CACHE_TTL     = float(os.environ.get("PAGE_CACHE_TTL", "1"))
+PAGE_CACHE_ENTRIES = int(os.environ.get("PAGE_CACHE_ENTRIES", "128"))
+
+def max_entry_id():
+    with read_router.connection() as conn:
+        cur = conn.cursor()
+        with metrics.phase("watermark"):
+            cur.execute("SELECT MAX(id) FROM guestbook")
+            (max_id,) = cur.fetchone()
+        cur.close()
+    return max_id
+
+page_cache = PageCache(max_entry_id, ttl=PAGE_CACHE_TTL, max_entries=PAGE_CACHE_ENTRIES)
+
+# ─── Pagination ──────────────────────────────────────────────────────
+PAGE_SIZE     = int(os.environ.get("PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", "200"))
+
+# With the partitioned schema, the landing page first looks only at the
+# last HOT_WINDOW_DAYS so MySQL prunes the query to the newest partitions.
+DB_SCHEMA_MODE  = os.environ.get("DB_SCHEMA_MODE", "flat")
+HOT_WINDOW_DAYS = int(os.environ.get("HOT_WINDOW_DAYS", "31"))
+PARTITIONED     = DB_SCHEMA_MODE == "partitioned"
+
+# Streaming mode: send the page header straight away and stream the rows
+# from an unbuffered cursor STREAM_CHUNK rows at a time. Streamed pages
+# skip the rendered-page cache.
+STREAM_RESPONSES = os.environ.get("STREAM_RESPONSES", "0") == "1"
+STREAM_CHUNK     = int(os.environ.get("STREAM_CHUNK", "50"))
+STREAM_BUFFER    = int(os.environ.get("STREAM_BUFFER", "16"))
+
+def size_param(size):
+    """?size= for links: the normalized page size, omitted when it is the default."""
+    return size if size != PAGE_SIZE else None
+
+class Pager:
+    """Newer/Older links for a page; filled in after the rows when streaming.
+
+    ``first_id`` is the newest id on the page, where the live feed picks up.
+    """
+    def __init__(self, size=PAGE_SIZE, prev_id=None, next_id=None, first_id=0):
+        self.size = size_param(size)
+        self.first_id = first_id
+        self.set(prev_id, next_id)
+
+    def set(self, prev_id, next_id):
+        self.prev_url = url_for("index", after=prev_id, size=self.size) if prev_id else None
+        self.next_url = url_for("index", before=next_id, size=self.size) if next_id else None
+
+def page_args(args):
+    """Parse ?before=<id> / ?after=<id> / ?size=<n> into a page request."""
+    def _int(key):
+        try:
+            value = int(args.get(key, ""))
+        except ValueError:
+            return None
+        return value if value > 0 else None
+    size = min(_int("size") or PAGE_SIZE, MAX_PAGE_SIZE)
+    return _int("before"), _int("after"), size
+
+def _fetch(conn, size, sql, params):
+    cur = conn.cursor()
+    with metrics.phase("query"):
+        cur.execute(sql, params)
+    with metrics.phase("fetch"):
+        rows = cur.fetchmany(size + 1)
+    cur.close()
+    metrics.observe_rows(len(rows))
+    return rows
+
+def fetch_page(conn, before=None, after=None, size=PAGE_SIZE):
+    """Keyset page over guestbook.id, newest first.
+
+    Returns (rows, prev_id, next_id); rows are (name, message, created_at, id)
+    and prev_id/next_id are the cursors for the neighbouring pages, or None.
+    """
+    if after is not None:
+        sql = ("SELECT name,message,created_at,id FROM guestbook "
+               "WHERE id > %s ORDER BY id ASC LIMIT %s")
+        params = (after, size + 1)
+    elif before is not None:
+        sql = ("SELECT name,message,created_at,id FROM guestbook "
+               "WHERE id < %s ORDER BY id DESC LIMIT %s")
+        params = (before, size + 1)
+    else:
+        sql = ("SELECT name,message,created_at,id FROM guestbook "
+               "ORDER BY id DESC LIMIT %s")
+        params = (size + 1,)
+
+    rows = None
+    if PARTITIONED and HOT_WINDOW_DAYS and before is None and after is None:
+        rows = _fetch(conn, size,
+                      "SELECT name,message,created_at,id FROM guestbook "
+                      "WHERE created_at >= NOW() - INTERVAL %s DAY "
+                      "ORDER BY id DESC LIMIT %s",
+                      (HOT_WINDOW_DAYS, size + 1))
+        if len(rows) <= size:
+            # Quiet period: the page reaches past the hot window.
+            rows = None
+    if rows is None:
+        rows = _fetch(conn, size, sql, params)
+
+    more = len(rows) > size
+    rows = rows[:size]
+    if after is not None:
+        rows.reverse()
+        has_newer, has_older = more, True
+    else:
+        has_newer, has_older = before is not None, more
 
-def load_config(path="/secrets/config"):
+    prev_id = rows[0][3] if rows and has_newer else None
+    next_id = rows[-1][3] if rows and has_older else None
+    return rows, prev_id, next_id
+
+def stream_page(pager, before=None, after=None, size=PAGE_SIZE, primary=False):
+    """Generator version of fetch_page for streaming responses.
+
+    Rows are pulled off an unbuffered cursor STREAM_CHUNK at a time while
+    the template consumes them; pager is filled in once the last row is out.
+    """
+    if after is not None:
+        sql = ("SELECT * FROM (SELECT name,message,created_at,id FROM guestbook "
+               "WHERE id > %s ORDER BY id ASC LIMIT %s) AS page ORDER BY id DESC")
+        params = (after, size)
+    elif before is not None:
+        sql = ("SELECT name,message,created_at,id FROM guestbook "
+               "WHERE id < %s ORDER BY id DESC LIMIT %s")
+        params = (before, size + 1)
+    else:
+        sql = ("SELECT name,message,created_at,id FROM guestbook "
+               "ORDER BY id DESC LIMIT %s")
+        params = (size + 1,)
+
+    count, first_id, last_id, more = 0, None, None, False
+    with read_router.connection(primary=primary) as conn:
+        cur = conn.cursor()
+        with metrics.phase("query"):
+            cur.execute(sql, params)
+        while True:
+            with metrics.phase("fetch"):
+                chunk = cur.fetchmany(STREAM_CHUNK)
+            if not chunk:
+                break
+            for row in chunk:
+                if count == size:
+                    # The extra row only tells us an older page exists.
+                    more = True
+                    continue
+                if first_id is None:
+                    first_id = pager.first_id = row[3]
+                last_id = row[3]
+                count += 1
+                yield row
+        cur.close()
+
+        if after is not None:
+            has_older = True
+            has_newer = False
+            if first_id is not None:
+                cur = conn.cursor()
+                cur.execute("SELECT 1 FROM guestbook WHERE id > %s LIMIT 1", (first_id,))
+                has_newer = cur.fetchone() is not None
+                cur.close()
+        else:
+            has_newer, has_older = before is not None, more
+    metrics.observe_rows(count)
+    pager.set(first_id if has_newer else None, last_id if has_older else None)
+
+# ─── Search ──────────────────────────────────────────────────────────
+SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", "20"))
+SEARCH_MAX_PAGES = int(os.environ.get("SEARCH_MAX_PAGES", "50"))
+
+def search_entries(conn, q, page=1, size=SEARCH_PAGE_SIZE):
+    """Relevance-ranked page of entries matching q (FULLTEXT on name, message).
+
+    Partitioned tables can't have a FULLTEXT index, so there it falls back
+    to a newest-first LIKE match over the hot window.
+
+    Returns (rows, has_more); rows are (name, message, created_at, id, score).
+    """
+    cur = conn.cursor()
+    with metrics.phase("search"):
+        if PARTITIONED:
+            pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            cur.execute(
+                "SELECT name,message,created_at,id,NULL AS score FROM guestbook "
+                "WHERE created_at >= NOW() - INTERVAL %s DAY "
+                "AND (name LIKE %s OR message LIKE %s) "
+                "ORDER BY id DESC LIMIT %s OFFSET %s",
+                (HOT_WINDOW_DAYS, pattern, pattern, size + 1, (page - 1) * size)
+            )
+        else:
+            cur.execute(
+                "SELECT name,message,created_at,id,"
+                " MATCH(name,message) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score "
+                "FROM guestbook "
+                "WHERE MATCH(name,message) AGAINST (%s IN NATURAL LANGUAGE MODE) "
+                "ORDER BY score DESC, id DESC LIMIT %s OFFSET %s",
+                (q, q, size + 1, (page - 1) * size)
+            )
+        rows = cur.fetchmany(size + 1)
+    cur.close()
+    metrics.observe_rows(len(rows))
+    return rows[:size], len(rows) > size
+
+# ─── JSON API ────────────────────────────────────────────────────────
+API_BULK_MAX = int(os.environ.get("API_BULK_MAX", "500"))
+
+def fetch_since(conn, since_id, size):
+    """Entries newer than since_id, oldest first, for incremental polling."""
+    cur = conn.cursor()
+    with metrics.phase("query"):
+        cur.execute(
+            "SELECT name,message,created_at,id FROM guestbook "
+            "WHERE id > %s ORDER BY id ASC LIMIT %s",
+            (since_id, size + 1)
+        )
+    with metrics.phase("fetch"):
+        rows = cur.fetchmany(size + 1)
+    cur.close()
+    metrics.observe_rows(len(rows))
+    return rows[:size], len(rows) > size
+
+def entry_json(row):
+    name, message, created_at, entry_id = row[:4]
+    return {
+        "id": entry_id,
+        "name": name,
+        "message": message,
+        "created_at": created_at.isoformat() if created_at else None,
+    }
+
+# guestbook.message is a TEXT column: 65,535 bytes.
+MESSAGE_MAX_BYTES = 65535
+
+def validate_entries(payload):
+    """Return (rows, errors) for a bulk POST body: a list or {"entries": [...]}."""
+    if isinstance(payload, dict):
+        payload = payload.get("entries")
+    if not isinstance(payload, list) or not payload:
+        return [], ["body must be a non-empty list of {name, message} objects"]
+    if len(payload) > API_BULK_MAX:
+        return [], [f"at most {API_BULK_MAX} entries per request"]
+    rows, errors = [], []
+    for i, item in enumerate(payload):
+        name = item.get("name") if isinstance(item, dict) else None
+        message = item.get("message") if isinstance(item, dict) else None
+        name = name.strip() if isinstance(name, str) else ""
+        message = message.strip() if isinstance(message, str) else ""
+        if not name or not message:
+            errors.append(f"entries[{i}]: name and message are required")
+        elif len(name) > 100:
+            errors.append(f"entries[{i}]: name is longer than 100 characters")
+        elif len(message.encode("utf-8")) > MESSAGE_MAX_BYTES:
+            errors.append(f"entries[{i}]: message is longer than {MESSAGE_MAX_BYTES} bytes")
+        else:
+            rows.append((name, message))
+    return rows, errors
+
+def json_response(data, status=200):
+    resp = Response(json.dumps(data, separators=(",", ":"), default=str),
+                    status=status, mimetype="application/json")
+    return compress_response(resp, request.accept_encodings)
+
+def render_stream(template, **context):
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template).stream(context)
+    stream.enable_buffering(STREAM_BUFFER)
+    return stream
+
+def load_config(path=CONFIG_DIR):
     data = {}
     if not os.path.isdir(path):
         print(f"[load_config] {path} not found or not a dir")
@@ -34,60 +421,478 @@ def load_config(path="/secrets/config"):
         fpath = os.path.join(path, fname)
         if os.path.isfile(fpath):
             with open(fpath) as f:
-                value = f.read().strip()
-                data[fname] = value
-                print(f"[load_config] loaded {fname} = {value!r}")
+                data[fname] = f.read().strip()
         else:
             print(f"[load_config] skipped non-file: {fpath}")
-    print(f"[load_config] final CONFIG = {data}")
+    # Names only: these files hold secrets.
+    print(f"[load_config] loaded {len(data)} keys from {path}: {', '.join(sorted(data))}")
     return data
 
+def load_cert_info(path=CERT_FILE):
+    from cryptography import x509
+    from cryptography.hazmat.backends import default_backend
+    with open(path,"rb") as f:
+        pem = f.read()
+    cert = x509.load_pem_x509_certificate(pem, default_backend())
+    serial  = format(cert.serial_number,"x").upper()
+    expires = cert.not_valid_after.isoformat()
+    print(f"[load_cert_info] loaded cert serial={serial} expires={expires}")
+    return serial, expires
+
+# Both are rewritten by VSO every few seconds to minutes, so only re-read
+# them when the files actually change.
+config_cache = FileCache(
+    "config", [CONFIG_DIR], metrics.timed("load_config", load_config),
+    check_interval=FILE_CACHE_CHECK_INTERVAL,
+)
+cert_cache = FileCache(
+    "cert", [CERT_FILE], metrics.timed("cert_parse", load_cert_info),
+    check_interval=FILE_CACHE_CHECK_INTERVAL,
+)
+
+# ─── Admission control ───────────────────────────────────────────────
+# Per worker process: at most MAX_IN_FLIGHT requests run at once, up to
+# ADMISSION_QUEUE more wait ADMISSION_TIMEOUT seconds, the rest get 503.
+# POSTs are also limited per client to POST_RATE_PER_MIN (bursts of
+# POST_BURST). 0 disables either limit.
+MAX_IN_FLIGHT       = int(os.environ.get("MAX_IN_FLIGHT", "0"))
+ADMISSION_QUEUE     = int(os.environ.get("ADMISSION_QUEUE", "16"))
+ADMISSION_TIMEOUT   = float(os.environ.get("ADMISSION_TIMEOUT", "2"))
+POST_RATE_PER_MIN   = float(os.environ.get("POST_RATE_PER_MIN", "0"))
+POST_BURST          = int(os.environ.get("POST_BURST", "5"))
+# Proxies in front of the pod that append to X-Forwarded-For (1 for an
+# OpenShift reencrypt route). 0 keys clients on the peer address, which
+# behind a passthrough route is the router for everyone.
+TRUSTED_PROXIES     = int(os.environ.get("TRUSTED_PROXIES", "0"))
+ADMISSION_EXEMPT    = {"metrics_endpoint", "healthz", "readyz", "events", "static"}
+
+admission = AdmissionLimiter(MAX_IN_FLIGHT, ADMISSION_QUEUE, ADMISSION_TIMEOUT)
+post_limiter = RateLimiter(POST_RATE_PER_MIN / 60, POST_BURST)
+
+def client_id(req):
+    # Clients can send their own X-Forwarded-For and proxies append to it,
+    # so only the hops our own proxies added (counted from the right) can
+    # be trusted.
+    if TRUSTED_PROXIES:
+        hops = [h.strip() for h in req.headers.get("X-Forwarded-For", "").split(",") if h.strip()]
+        if len(hops) >= TRUSTED_PROXIES:
+            return hops[-TRUSTED_PROXIES]
+    return req.remote_addr
+
+# ─── Live entry feed ─────────────────────────────────────────────────
+# /events pushes new entries over SSE. One watcher thread per process
+# polls by id watermark and fans out to every viewer. Only one process in
+# the pod queries the database; it shares the rows through FEED_SHARE_FILE
+# and the others read them from there, so idle viewers cost about one
+# query per FEED_POLL_INTERVAL per pod. Each open stream holds a
+# worker thread, so only FEED_MAX_CLIENTS stream at once; the rest get the
+# entries they missed and reconnect after FEED_RETRY_MS.
+LIVE_FEED          = os.environ.get("LIVE_FEED", "1") == "1"
+FEED_POLL_INTERVAL = float(os.environ.get("FEED_POLL_INTERVAL", "1"))
+FEED_BACKLOG       = int(os.environ.get("FEED_BACKLOG", "500"))
+FEED_HEARTBEAT     = float(os.environ.get("FEED_HEARTBEAT", "15"))
+FEED_MAX_STREAM    = float(os.environ.get("FEED_MAX_STREAM", "300"))
+FEED_RETRY_MS      = int(os.environ.get("FEED_RETRY_MS", "10000"))
+FEED_SHARE_FILE    = os.environ.get(
+    "FEED_SHARE_FILE", os.path.join(tempfile.gettempdir(), "guestbook-feed.json")
+)  # "" = every process queries for itself
+FEED_MAX_CLIENTS   = int(os.environ.get(
+    "FEED_MAX_CLIENTS",
+    "0" if os.environ.get("SERVER_MODE") == "prefork" else str(int(os.environ.get("WEB_THREADS", "8")) // 2),
+))
+
+def poll_entries(since_id):
+    with read_router.connection() as conn:
+        rows, _ = fetch_since(conn, since_id, MAX_PAGE_SIZE)
+    return [(r[3], json.dumps(entry_json(r), separators=(",", ":"))) for r in rows]
+
+def latest_entry_id():
+    return max_entry_id() or 0
+
+if FEED_SHARE_FILE:
+    shared_poll = SharedPoll(poll_entries, FEED_SHARE_FILE,
+                             lease=3 * FEED_POLL_INTERVAL, keep=FEED_BACKLOG)
+    feed = EntryFeed(
+        shared_poll,
+        partial(shared_poll.latest_id, latest_entry_id),
+        interval=FEED_POLL_INTERVAL,
+        backlog=FEED_BACKLOG,
+    )
+else:
+    shared_poll = None
+    feed = EntryFeed(
+        poll_entries,
+        latest_entry_id,
+        interval=FEED_POLL_INTERVAL,
+        backlog=FEED_BACKLOG,
+    )
+
+def sse_events(entries, last_id):
+    if entries is None:
+        return "event: reset\ndata: {}\n\n"
+    if not entries:
+        # An id-only block still moves the client's Last-Event-ID along.
+        return f"id: {last_id}\n\n" if last_id is not None else ": keep-alive\n\n"
+    return "".join(f"id: {i}\nevent: entry\ndata: {data}\n\n" for i, data in entries)
+
+def sse_stream(last_id, streaming):
+    if not streaming:
+        yield f"retry: {FEED_RETRY_MS}\n\n"
+        yield sse_events(*feed.since(last_id))
+        return
+    yield "retry: 2000\n\n"
+    with feed.listen():
+        deadline = time.monotonic() + FEED_MAX_STREAM
+        while time.monotonic() < deadline:
+            entries, last_id = feed.since(last_id, FEED_HEARTBEAT)
+            yield sse_events(entries, last_id)
+            if entries is None:
+                return
+
+# ─── Health checks ───────────────────────────────────────────────────
+# /healthz and /readyz only read what the background checker found on
+# its last pass, so kubelet probes never open connections or parse files.
+HEALTH_CHECK_INTERVAL = float(os.environ.get("HEALTH_CHECK_INTERVAL", "10"))
+SECRET_MAX_AGE        = float(os.environ.get("SECRET_MAX_AGE", "0"))
+CERT_MIN_VALIDITY     = float(os.environ.get("CERT_MIN_VALIDITY", "30"))
+
+def check_db():
+    with db_pool.connection() as conn:
+        conn.ping(reconnect=False)
+    return {"host": DB_HOST, "generation": db_pool.stats()["generation"]}
+
+def check_secrets():
+    user, _ = get_db_creds()
+    age = time.time() - os.stat(DB_PASS_FILE).st_mtime
+    if SECRET_MAX_AGE and age > SECRET_MAX_AGE:
+        raise RuntimeError(f"DB credentials not refreshed for {age:.0f}s")
+    return {"db_user": user, "age_s": round(age), "config_keys": len(config_cache.get())}
+
+def check_cert():
+    serial, expires = cert_cache.get()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    remaining = (datetime.fromisoformat(expires) - now).total_seconds()
+    if remaining < CERT_MIN_VALIDITY:
+        raise RuntimeError(f"certificate {serial} expires in {remaining:.0f}s")
+    return {"serial": serial, "expires": expires, "remaining_s": round(remaining)}
+
+health = HealthChecker(
+    {"db": check_db, "secrets": check_secrets, "cert": check_cert},
+    interval=HEALTH_CHECK_INTERVAL,
+)
+
+# ─── Profiling ───────────────────────────────────────────────────────
+# PROFILING=1 installs a sampling profiler: requests sent with
+# "X-Profile: $PROFILE_TOKEN" are profiled, as are PROFILE_SAMPLE_PERCENT
+# of all requests. Output is collapsed stacks for flamegraph tools, in
+# PROFILE_DIR and/or at /debug/profiles (same header required). With
+# PROFILING unset none of it is imported or hooked in.
+PROFILING = os.environ.get("PROFILING", "0") == "1"
+
+profiler = None
+if PROFILING:
+    from profiler import HEADER as PROFILE_HEADER, RequestProfiler
+    profiler = RequestProfiler(
+        token=os.environ.get("PROFILE_TOKEN", ""),
+        sample_percent=float(os.environ.get("PROFILE_SAMPLE_PERCENT", "0")),
+        out_dir=os.environ.get("PROFILE_DIR", ""),
+        keep=int(os.environ.get("PROFILE_KEEP", "20")),
+        interval=float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000,
+    )
+
+# ─── Warm-up ─────────────────────────────────────────────────────────
+DB_POOL_WARM = int(os.environ.get("DB_POOL_WARM", "2"))
+
+def warm_up():
+    """Fill the caches, compile templates and open a few DB connections.
+
+    Runs once per worker before it takes traffic, then starts the health
+    checker so /readyz turns green as soon as the first pass completes.
+    """
+    started = time.perf_counter()
+    creds_cache.get()
+    config_cache.get()
+    cert_cache.get()
+    for name in ("index.html", "search.html"):
+        app.jinja_env.get_template(name)
+    opened = []
+    try:
+        for _ in range(min(DB_POOL_WARM, DB_POOL_SIZE)):
+            opened.append(db_pool.acquire())
+    except Exception as e:
+        print(f"[startup] DB warm-up failed, continuing: {e}")
+    for conn, gen in opened:
+        db_pool.release(conn, gen)
+    health.ensure_started()
+    metrics.ensure_sampler()
+    warm = time.perf_counter() - started
+    metrics.observe_startup("import", IMPORT_SECONDS)
+    metrics.observe_startup("warm_up", warm)
+    print(f"[startup] pid={os.getpid()} import={IMPORT_SECONDS * 1000:.0f}ms "
+          f"warm_up={warm * 1000:.0f}ms db_connections={len(opened)}")
 
 
 app = Flask(__name__)
 
+metrics.watch_pool("primary", db_pool)
+for _replica in read_router.replicas:
+    metrics.watch_pool(_replica.host, _replica.pool)
+for _cache in (creds_cache, config_cache, cert_cache):
+    metrics.watch_file_cache(_cache)
+metrics.watch_page_cache(page_cache)
+metrics.watch_write_queue(write_queue)
+metrics.watch_admission(admission)
+metrics.watch_rate_limiter(post_limiter)
+
+if profiler is not None:
+    @app.before_request
+    def start_profile():
+        if request.endpoint != "profiles":
+            g.profile = profiler.start(request)
+
+    @app.after_request
+    def tag_profile(resp):
+        if g.get("profile") is not None:
+            g.profile.status = resp.status_code
+            resp.headers["X-Profile-Id"] = g.profile.name
+        return resp
+
+    @app.teardown_request
+    def finish_profile(exc):
+        profile = g.pop("profile", None)
+        if profile is not None:
+            profiler.finish(profile, profile.status)
+
+    @app.route("/debug/profiles")
+    @app.route("/debug/profiles/<name>")
+    def profiles(name=None):
+        if not profiler.authorized(request):
+            return f"{PROFILE_HEADER} header required", 403
+        if name is None:
+            return jsonify(profiler.profiles())
+        profile = profiler.get(name)
+        if profile is None:
+            return "No such profile", 404
+        return profile.folded(), 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+@app.before_request
+def start_timer():
+    metrics.ensure_sampler()
+    health.ensure_started()
+    g.started = time.perf_counter()
+
+@app.before_request
+def admit():
+    if request.endpoint in ADMISSION_EXEMPT:
+        return
+    if request.method == "POST":
+        post_limiter.check(client_id(request))
+    admission.acquire()
+    g.admitted = True
+
+@app.teardown_request
+def release_slot(exc):
+    if g.pop("admitted", False):
+        admission.release()
+
+@app.after_request
+def record_request(resp):
+    started = g.get("started")
+    if started is not None:
+        metrics.observe_request(request.method, resp.status_code, time.perf_counter() - started)
+    return resp
+
+@app.errorhandler(PoolTimeout)
+def db_busy(e):
+    print(f"[index] {e}")
+    return "Database busy, please retry.", 503, {"Retry-After": "1"}
+
+@app.errorhandler(QueueFull)
+def queue_full(e):
+    print(f"[index] {e}")
+    return "Too many submissions, please retry.", 503, {"Retry-After": "1"}
+
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    return "Server busy, please retry.", 503, {"Retry-After": str(e.retry_after)}
+
+@app.errorhandler(RateLimited)
+def rate_limited(e):
+    return "Too many submissions, please slow down.", 429, {"Retry-After": str(e.retry_after)}
+
 @app.route("/", methods=["GET","POST"])
 def index():
-    conn, db_user, db_pass = get_connection()
-    cur = conn.cursor()
-
     if request.method == "POST":
         name    = request.form.get("name","").strip()
         message = request.form.get("message","").strip()
-        if name and message:
-            cur.execute(
-                "INSERT INTO guestbook (name,message) VALUES (%s,%s)",
-                (name, message)
-            )
-            conn.commit()
-        return redirect(url_for("index"))
+        if name and message and WRITE_BEHIND:
+            write_queue.submit((name, message))
+        elif name and message:
+            insert_entries([(name, message)])
+        resp = redirect(url_for("index"))
+        if name and message and DB_READ_HOSTS:
+            until = time.time() + READ_YOUR_WRITES_SECONDS
+            resp.set_cookie(READ_PRIMARY_COOKIE, f"{until:.3f}",
+                            max_age=READ_YOUR_WRITES_SECONDS, secure=True, httponly=True)
+        return resp
 
-    cur.execute("SELECT name,message,created_at FROM guestbook ORDER BY id DESC")
-    entries = cur.fetchall()
-    cur.close()
-    conn.close()
+    before, after, size = page_args(request.args)
+    serial, expires = cert_cache.get()
+    CONFIG = config_cache.get()
+    db_user, db_pass = get_db_creds()
+    # Pages read from the primary after a write bypass the shared cache.
+    pinned = bool(DB_READ_HOSTS) and read_from_primary(request)
+    use_cache = PAGE_CACHE and not pinned
 
-    # Parse cert
-    with open(CERT_FILE,"rb") as f:
-        pem = f.read()
-    cert = x509.load_pem_x509_certificate(pem, default_backend())
-    serial  = format(cert.serial_number,"x").upper()
-    expires = cert.not_valid_after.isoformat()
-
-    # Parse Secrets
-    CONFIG = load_config()
-
-    return render_template(
-        "index.html",
+    page = dict(
+        live=LIVE_FEED and before is None and after is None,
         serial=serial,
         expires=expires,
         db_user=db_user,
         lease_id=db_pass,
         vault_message=CONFIG.get("message", "None Found."),
         vault_secret=CONFIG.get("supersecretpassword", "NA"),
-        rows=entries
     )
 
+    if STREAM_RESPONSES:
+        pager = Pager(size)
+        rows = stream_page(pager, before, after, size, primary=pinned)
+        return Response(
+            stream_with_context(render_stream("index.html", rows=rows, pager=pager, **page)),
+            mimetype="text/html"
+        )
+
+    cached = None
+    if use_cache:
+        key = (before, after, size)
+        version = (page_cache.watermark(), serial, expires, db_user, db_pass,
+                   tuple(sorted(CONFIG.items())))
+        cached = page_cache.get(key, version)
+
+    if cached is None:
+        with read_router.connection(primary=pinned) as conn:
+            entries, prev_id, next_id = fetch_page(conn, before, after, size)
+        pager = Pager(size, prev_id, next_id, entries[0][3] if entries else 0)
+        with metrics.phase("render"):
+            body = render_template("index.html", rows=entries, pager=pager, **page)
+        if not use_cache:
+            return body
+        cached = page_cache.put(key, version, body)
+
+    body, etag = cached
+    resp = make_response(body)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp.make_conditional(request)
+
+@app.route("/search")
+def search():
+    q = request.args.get("q", "").strip()[:200]
+    try:
+        page = min(max(int(request.args.get("page", "1")), 1), SEARCH_MAX_PAGES)
+    except ValueError:
+        page = 1
+
+    rows, has_more = [], False
+    if q:
+        with read_router.connection() as conn:
+            rows, has_more = search_entries(conn, q, page)
+
+    return render_template(
+        "search.html",
+        q=q,
+        rows=rows,
+        prev_url=url_for("search", q=q, page=page - 1) if page > 1 else None,
+        next_url=url_for("search", q=q, page=page + 1) if has_more and page < SEARCH_MAX_PAGES else None
+    )
+
+@app.route("/api/entries", methods=["GET"])
+def api_entries():
+    """Entries as JSON.
+
+    ?since_id=N returns entries newer than N (oldest first) for cheap
+    polling; otherwise ?before=<id>&size=N pages newest first.
+    """
+    before, _, size = page_args(request.args)
+    pinned = bool(DB_READ_HOSTS) and read_from_primary(request)
+    since = request.args.get("since_id")
+
+    if since is not None:
+        try:
+            since_id = max(int(since), 0)
+        except ValueError:
+            return json_response({"error": "since_id must be an integer"}, 400)
+        with read_router.connection(primary=pinned) as conn:
+            rows, more = fetch_since(conn, since_id, size)
+        last_id = rows[-1][3] if rows else since_id
+        return json_response({
+            "entries": [entry_json(r) for r in rows],
+            "since_id": last_id,
+            "more": more,
+            "next": url_for("api_entries", since_id=last_id, size=size_param(size)),
+        })
+
+    with read_router.connection(primary=pinned) as conn:
+        rows, _, next_id = fetch_page(conn, before, None, size)
+    return json_response({
+        "entries": [entry_json(r) for r in rows],
+        "since_id": rows[0][3] if rows and before is None else None,
+        "next": url_for("api_entries", before=next_id, size=size_param(size)) if next_id else None,
+    })
+
+@app.route("/api/entries", methods=["POST"])
+def api_bulk_insert():
+    payload = request.get_json(silent=True)
+    rows, errors = validate_entries(payload)
+    if errors:
+        return json_response({"errors": errors}, 400)
+    insert_entries(rows)
+    return json_response({"inserted": len(rows)}, 201)
+
+@app.route("/events")
+def events():
+    """Server-sent events: one ``entry`` event per new guestbook entry."""
+    last = request.headers.get("Last-Event-ID") or request.args.get("since")
+    try:
+        last_id = int(last) if last else None
+    except ValueError:
+        last_id = None
+    streaming = feed.listeners < FEED_MAX_CLIENTS
+    return Response(sse_stream(last_id, streaming), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/healthz")
+def healthz():
+    ok, detail = health.live()
+    return jsonify(detail), 200 if ok else 503
+
+@app.route("/readyz")
+def readyz():
+    ok, detail = health.ready()
+    return jsonify(detail), 200 if ok else 503
+
+@app.route("/metrics")
+def metrics_endpoint():
+    body, content_type = metrics.render()
+    return body, 200, {"Content-Type": content_type}
+
+@app.route("/debug/cache")
+def cache_stats():
+    stats = {c.name: c.stats() for c in (creds_cache, config_cache, cert_cache)}
+    stats["page"] = page_cache.stats()
+    stats["reads"] = read_router.stats()
+    stats["admission"] = admission.stats()
+    stats["post_rate"] = post_limiter.stats()
+    stats["feed"] = feed.stats()
+    if shared_poll:
+        stats["feed"].update(shared=shared_poll.shared, queried=shared_poll.queried)
+    return jsonify(stats)
+
 if __name__ == "__main__":
-    ssl_ctx = (CERT_FILE, KEY_FILE)
-    app.run(host="0.0.0.0", port=5000, ssl_context=ssl_ctx)
+    # Development server only; the container runs server.py.
+    from tls import ReloadingSSLContext
+    warm_up()
+    ssl_ctx = ReloadingSSLContext(CERT_FILE, KEY_FILE)
+    ssl_ctx.get()
+    ssl_ctx.watch()
+    app.run(host="0.0.0.0", port=5000, ssl_context=ssl_ctx.context)
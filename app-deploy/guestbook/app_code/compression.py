@@ -0,0 +1,33 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this aren't worth the CPU or the extra header.
+MIN_SIZE = 512
+
+
+def available_encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress_response(resp, accept_encodings, min_size=MIN_SIZE):
+    """Compress resp in place with the best encoding the client accepts."""
+    resp.vary.add("Accept-Encoding")
+    if resp.direct_passthrough or "Content-Encoding" in resp.headers:
+        return resp
+    body = resp.get_data()
+    if len(body) < min_size:
+        return resp
+    encoding = accept_encodings.best_match(available_encodings())
+    if encoding == "br":
+        body = brotli.compress(body, quality=5)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=6)
+    else:
+        return resp
+    resp.set_data(body)
+    resp.headers["Content-Encoding"] = encoding
+    return resp
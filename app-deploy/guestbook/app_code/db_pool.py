@@ -0,0 +1,269 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the checkout timeout."""
+
+
+class ConnectionPool:
+    """Bounded MySQL connection pool that follows Vault credential rotation.
+
+    ``connect(user, pwd)`` opens a new connection and ``creds()`` returns the
+    current ``(user, pwd)`` pair. Every checkout compares the creds against
+    the ones the pool was built with; when VSO rotates the lease the pool
+    bumps its generation, closes idle connections from the old lease and
+    lets in-flight ones finish before closing them on return.
+
+    ``on_checkout(seconds)``, if given, is called with the time each
+    checkout took (waiting plus connecting).
+    """
+
+    def __init__(self, connect, creds, size=5, max_overflow=5,
+                 idle_timeout=300, timeout=10, ping_after=30, on_checkout=None):
+        self._connect = connect
+        self._creds = creds
+        self.on_checkout = on_checkout
+        self.size = size
+        self.max_overflow = max_overflow
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, generation, returned_at)
+        self._in_use = 0
+        self._waiting = 0
+        self._generation = 0
+        self._current = None
+        self.opened = 0
+        self.rotations = 0
+
+    @property
+    def creds(self):
+        return self._current
+
+    def _check_rotation(self):
+        # Caller holds self._cond. Returns idle connections that must be closed.
+        creds = self._creds()
+        if creds == self._current:
+            return []
+        if self._current is not None:
+            self.rotations += 1
+            print(f"[db_pool] credentials rotated (user={creds[0]}), draining pool")
+        self._current = creds
+        self._generation += 1
+        stale = [c for c, _, _ in self._idle]
+        self._idle.clear()
+        return stale
+
+    def acquire(self):
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            stale = self._check_rotation()
+            conn = None
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    c, gen, returned_at = self._idle.pop()
+                    if gen != self._generation or now - returned_at > self.idle_timeout:
+                        stale.append(c)
+                        continue
+                    conn, idle_for = c, now - returned_at
+                    break
+                if conn is not None or self._in_use < self.size + self.max_overflow:
+                    break
+                remaining = deadline - now
+                if remaining <= 0:
+                    _close_all(stale)
+                    raise PoolTimeout(
+                        f"no DB connection available within {self.timeout}s"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._in_use += 1
+            gen, creds = self._generation, self._current
+
+        _close_all(stale)
+        try:
+            if conn is not None and idle_for > self.ping_after:
+                try:
+                    conn.ping(reconnect=False)
+                except Exception:
+                    _close_all([conn])
+                    conn = None
+            if conn is None:
+                conn = self._connect(*creds)
+                self.opened += 1
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        if self.on_checkout is not None:
+            self.on_checkout(time.perf_counter() - started)
+        return conn, gen
+
+    def release(self, conn, gen, discard=False):
+        with self._cond:
+            self._in_use -= 1
+            keep = (not discard
+                    and gen == self._generation
+                    and len(self._idle) < self.size)
+            if keep:
+                self._idle.append((conn, gen, time.monotonic()))
+            self._cond.notify()
+        if not keep:
+            _close_all([conn])
+
+    @contextmanager
+    def connection(self):
+        conn, gen = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, gen, discard=True)
+            raise
+        self.release(conn, gen)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "opened": self.opened,
+                "rotations": self.rotations,
+                "generation": self._generation,
+            }
+
+    def close(self):
+        with self._cond:
+            idle = [c for c, _, _ in self._idle]
+            self._idle.clear()
+            self._generation += 1
+        _close_all(idle)
+
+
+def _close_all(conns):
+    for c in conns:
+        try:
+            c.close()
+        except Exception:
+            pass
+
+
+class _Replica:
+    def __init__(self, host, pool):
+        self.host = host
+        self.pool = pool
+        self.healthy = True
+        self.failures = 0
+
+
+class ReadRouter:
+    """Routes reads to replica pools and falls back to the primary pool.
+
+    ``replicas`` maps host -> ConnectionPool. Replicas are chosen
+    round-robin or by fewest checked-out connections among those that
+    passed the last health check; a replica that fails a checkout is taken
+    out of rotation until the background checker sees it answer again.
+    """
+
+    STRATEGIES = ("round_robin", "least_connections")
+
+    def __init__(self, primary, replicas, strategy="round_robin", check_interval=5):
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"unknown read strategy {strategy!r}")
+        self.primary = primary
+        self.replicas = [_Replica(host, pool) for host, pool in replicas.items()]
+        self.strategy = strategy
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._next = 0
+        self._checker_pid = None
+        self.primary_reads = 0
+        self.replica_reads = 0
+
+    def _ensure_checker(self):
+        if not self.replicas or self._checker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+            threading.Thread(target=self._check_loop, name="replica-health", daemon=True).start()
+
+    def _check_loop(self):
+        while True:
+            time.sleep(self.check_interval)
+            for replica in self.replicas:
+                try:
+                    with replica.pool.connection() as conn:
+                        conn.ping(reconnect=False)
+                except Exception as e:
+                    self._mark(replica, False, e)
+                else:
+                    self._mark(replica, True)
+
+    def _mark(self, replica, healthy, error=None):
+        if healthy and not replica.healthy:
+            print(f"[db_pool] read replica {replica.host} is back in rotation")
+        elif not healthy:
+            replica.failures += 1
+            if replica.healthy:
+                print(f"[db_pool] read replica {replica.host} out of rotation: {error}")
+        replica.healthy = healthy
+
+    def _pick(self):
+        healthy = [r for r in self.replicas if r.healthy]
+        if not healthy:
+            return None
+        if self.strategy == "least_connections":
+            return min(healthy, key=lambda r: r.pool.stats()["in_use"])
+        with self._lock:
+            self._next = (self._next + 1) % len(healthy)
+            return healthy[self._next]
+
+    @contextmanager
+    def connection(self, primary=False):
+        self._ensure_checker()
+        replica = None if primary else self._pick()
+        if replica is not None:
+            try:
+                conn, gen = replica.pool.acquire()
+            except Exception as e:
+                self._mark(replica, False, e)
+                replica = None
+        if replica is None:
+            self.primary_reads += 1
+            with self.primary.connection() as conn:
+                yield conn
+            return
+        self.replica_reads += 1
+        try:
+            yield conn
+        except BaseException:
+            replica.pool.release(conn, gen, discard=True)
+            raise
+        replica.pool.release(conn, gen)
+
+    def stats(self):
+        return {
+            "strategy": self.strategy,
+            "primary_reads": self.primary_reads,
+            "replica_reads": self.replica_reads,
+            "replicas": {
+                r.host: dict(r.pool.stats(), healthy=r.healthy, failures=r.failures)
+                for r in self.replicas
+            },
+        }
@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class EntryFeed:
+    """Shared per-process watcher that fans new entries out to SSE clients.
+
+    One thread calls ``poll(since_id)`` every ``interval`` seconds while
+    anyone is listening and keeps the last ``backlog`` entries, so the
+    database sees one query per interval per process no matter how many
+    viewers are connected. ``poll`` returns ``(id, payload)`` pairs, oldest
+    first; ``latest_id()`` seeds the watermark when the watcher starts.
+    ``notify()`` wakes the watcher early after a local insert.
+    """
+
+    def __init__(self, poll, latest_id, interval=1.0, backlog=500, idle_after=60.0, rewind=100):
+        self._poll = poll
+        self._latest_id = latest_id
+        self.rewind = rewind
+        self.interval = interval
+        self.idle_after = idle_after
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._entries = deque(maxlen=backlog)  # (id, payload)
+        self._floor = None  # entries with id > floor are all buffered
+        self._watermark = None
+        self._listeners = 0
+        self._interest = 0.0
+        self._pid = None
+        self.polls = 0
+        self.errors = 0
+
+    def _ensure_watcher(self):
+        self._interest = time.monotonic()
+        if self._pid == os.getpid():
+            if not self._wake.is_set() and self._watermark is None:
+                self._wake.set()
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._watermark = None
+            threading.Thread(target=self._watch, name="entry-feed", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            if self._listeners == 0 and time.monotonic() - self._interest > self.idle_after:
+                # Nobody is watching: stop polling and start over from the
+                # current watermark when the next viewer shows up.
+                with self._cond:
+                    self._watermark = None
+                self._wake.wait()
+            self._wake.clear()
+            try:
+                self._refresh()
+            except Exception as e:
+                self.errors += 1
+                print(f"[feed] poll failed: {e}")
+            self._wake.wait(self.interval)
+
+    def _refresh(self):
+        watermark = self._watermark
+        seeding = watermark is None
+        if seeding:
+            # Start a little in the past so a page rendered just before the
+            # watcher (re)started can catch up without reloading.
+            watermark = max(self._latest_id() - self.rewind, 0)
+        rows = self._poll(watermark)
+        self.polls += 1
+        if not rows and not seeding:
+            return
+        with self._cond:
+            if seeding:
+                self._entries.clear()
+                self._floor = watermark
+            for entry_id, payload in rows:
+                if len(self._entries) == self._entries.maxlen:
+                    self._floor = self._entries[0][0]
+                self._entries.append((entry_id, payload))
+            self._watermark = rows[-1][0] if rows else watermark
+            self._cond.notify_all()
+
+    def notify(self):
+        self._wake.set()
+
+    def since(self, last_id, timeout=0.0):
+        """Entries after ``last_id``, waiting up to ``timeout`` for some.
+
+        Returns ``(entries, last_id)``, or ``(None, watermark)`` when
+        ``last_id`` is older than the buffer and the client must reload.
+        ``last_id=None`` means "from now on".
+        """
+        self._ensure_watcher()
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._watermark is not None:
+                    if last_id is None:
+                        last_id = self._watermark
+                    if last_id < self._floor:
+                        return None, self._watermark
+                    if last_id < self._watermark:
+                        break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return [], last_id
+                self._cond.wait(remaining)
+            entries = [e for e in self._entries if e[0] > last_id]
+            return entries, entries[-1][0] if entries else last_id
+
+    @contextmanager
+    def listen(self):
+        """Count a connected streaming client for as long as it stays."""
+        with self._cond:
+            self._listeners += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._listeners -= 1
+                self._interest = time.monotonic()
+
+    @property
+    def listeners(self):
+        return self._listeners
+
+    def stats(self):
+        with self._cond:
+            return {
+                "listeners": self._listeners,
+                "buffered": len(self._entries),
+                "watermark": self._watermark,
+                "polls": self.polls,
+                "errors": self.errors,
+            }
+
+
+class SharedPoll:
+    """Shares one process's feed queries with the other workers in the pod.
+
+    Wraps ``poll(since_id)`` so that only the process holding the lease
+    queries the database. It writes the rows it has seen, a contiguous
+    window of ids from ``floor`` to ``watermark``, to ``path``. The other
+    processes answer from that file while the lease is fresh, so the pod
+    runs about one query per interval however many workers it has.
+
+    The lease lapses ``lease`` seconds after the leader's last poll. That
+    happens when its watcher goes idle or the process dies, and the next
+    worker to poll takes over. Callers older than the shared window, or
+    any failure to read or write the file, fall back to querying
+    directly.
+    """
+
+    def __init__(self, poll, path, lease=3.0, keep=500):
+        self._poll = poll
+        self.path = path
+        self.lease = lease
+        self.keep = keep
+        self._cached = (None, None)  # (file signature, state)
+        self.shared = 0
+        self.queried = 0
+
+    def _read(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if self._cached[0] == sig:
+            return self._cached[1]
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._cached = (sig, state)
+        return state
+
+    def _publish(self, state, since_id, rows, now):
+        # Extend the shared window when it ends where this poll started;
+        # otherwise start a new one at since_id.
+        if state and state["floor"] <= since_id <= state["watermark"]:
+            floor = state["floor"]
+            window = [r for r in state["rows"] if r[0] <= since_id] + [list(r) for r in rows]
+        else:
+            floor, window = since_id, [list(r) for r in rows]
+        if len(window) > self.keep:
+            floor, window = window[-self.keep - 1][0], window[-self.keep:]
+        watermark = max(since_id, rows[-1][0]) if rows else since_id
+        if (state and state["pid"] == os.getpid() and not rows
+                and state["watermark"] == watermark and now - state["at"] < self.lease / 3):
+            return  # nothing new and the lease is still fresh
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"pid": os.getpid(), "at": now, "floor": floor,
+                           "watermark": watermark, "rows": window}, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"[feed] could not share poll results: {e}")
+
+    def __call__(self, since_id):
+        state = self._read()
+        now = time.time()
+        if state and state["pid"] != os.getpid() and now - state["at"] < self.lease:
+            if since_id >= state["floor"]:
+                self.shared += 1
+                return [tuple(r) for r in state["rows"] if r[0] > since_id]
+            self.queried += 1
+            return self._poll(since_id)
+        rows = self._poll(since_id)
+        self.queried += 1
+        self._publish(state, since_id, rows, now)
+        return rows
+
+    def latest_id(self, fallback):
+        """The shared watermark while the lease is fresh, else ``fallback()``."""
+        state = self._read()
+        if state and time.time() - state["at"] < self.lease:
+            return state["watermark"]
+        return fallback()
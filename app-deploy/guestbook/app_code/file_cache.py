@@ -0,0 +1,208 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+import sys
+import threading
+import time
+import weakref
+
+# inotify flags (see <sys/inotify.h>)
+IN_MODIFY      = 0x00000002
+IN_ATTRIB      = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF   = 0x00000800
+IN_Q_OVERFLOW  = 0x00004000
+IN_CLOEXEC     = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+              IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF |
+              IN_MOVE_SELF)
+
+_EVENT = struct.Struct("iIII")
+
+
+class _Inotify:
+    """One inotify fd + reader thread per process, shared by all caches."""
+
+    def __init__(self, libc):
+        self._libc = libc
+        self._fd = libc.inotify_init1(IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._lock = threading.Lock()
+        self._watches = {}   # wd -> [FileCache]
+        self._by_dir = {}    # dir -> wd
+        t = threading.Thread(target=self._run, name="file-cache-inotify", daemon=True)
+        t.start()
+
+    def watch(self, directory, cache):
+        with self._lock:
+            wd = self._by_dir.get(directory)
+            if wd is None:
+                wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+                if wd < 0:
+                    return False
+                self._by_dir[directory] = wd
+            self._watches.setdefault(wd, []).append(cache)
+            return True
+
+    def _run(self):
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except OSError as e:
+                print(f"[file_cache] inotify read failed: {e}", file=sys.stderr)
+                return
+            dirty = set()
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+                offset += _EVENT.size + length
+                with self._lock:
+                    if mask & IN_Q_OVERFLOW:
+                        for caches in self._watches.values():
+                            dirty.update(caches)
+                    else:
+                        dirty.update(self._watches.get(wd, ()))
+            for cache in dirty:
+                cache.invalidate()
+
+
+_inotify = None
+_inotify_pid = None
+_inotify_lock = threading.Lock()
+
+
+def _get_inotify():
+    global _inotify, _inotify_pid
+    if os.environ.get("FILE_CACHE_INOTIFY", "1") == "0":
+        return None
+    with _inotify_lock:
+        # Reader threads do not survive fork(); every worker gets its own.
+        if _inotify_pid != os.getpid():
+            _inotify_pid = os.getpid()
+            _inotify = None
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+                libc.inotify_init1
+                _inotify = _Inotify(libc)
+            except (OSError, AttributeError) as e:
+                print(f"[file_cache] inotify unavailable, using stat checks: {e}")
+        return _inotify
+
+
+def _signature(path):
+    try:
+        lst = os.lstat(path)
+        target = os.readlink(path) if os.path.islink(path) else None
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (lst.st_ino, lst.st_mtime_ns, target, st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+_caches = weakref.WeakSet()
+
+
+def _after_fork():
+    # A cache built before fork() holds watches on the parent's inotify fd;
+    # re-register against the child's own and re-check the files once.
+    for cache in list(_caches):
+        cache._watched = None
+        cache._stale = True
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+class FileCache:
+    """Caches ``loader()`` until one of ``paths`` changes.
+
+    With inotify the parent directories are watched and a change simply
+    marks the cache stale, so a hit costs no syscalls at all. Without it
+    (or for paths whose directory can't be watched) the cache compares
+    inode / mtime / symlink target of each path, at most once every
+    ``check_interval`` seconds.
+    """
+
+    def __init__(self, name, paths, loader, check_interval=1.0):
+        self.name = name
+        self.paths = list(paths)
+        self._loader = loader
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._value = None
+        self._loaded = False
+        self._stale = True
+        self._sig = None
+        self._next_check = 0.0
+        self._watched = None
+        self.hits = 0
+        self.misses = 0
+        self.stat_checks = 0
+        _caches.add(self)
+
+    def invalidate(self):
+        self._stale = True
+
+    def _watch(self):
+        inotify = _get_inotify()
+        if inotify is None:
+            return False
+        dirs = set()
+        for path in self.paths:
+            dirs.add(path if os.path.isdir(path) else os.path.dirname(path) or ".")
+        if not all(os.path.isdir(d) for d in dirs):
+            return False
+        return all(inotify.watch(d, self) for d in sorted(dirs))
+
+    def _changed(self):
+        if self._stale:
+            return True
+        if self._watched:
+            return False
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        self.stat_checks += 1
+        if tuple(_signature(p) for p in self.paths) != self._sig:
+            self._stale = True
+        return self._stale
+
+    def get(self):
+        if self._loaded and not self._changed():
+            self.hits += 1
+            return self._value
+        with self._lock:
+            if self._loaded and not self._changed():
+                self.hits += 1
+                return self._value
+            if self._watched is None:
+                self._watched = self._watch()
+            # Clear first so an event that lands mid-reload re-marks us stale.
+            self._stale = False
+            self._sig = tuple(_signature(p) for p in self.paths)
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                self._value = self._loader()
+            except Exception:
+                self._stale = True
+                raise
+            self._loaded = True
+            self.misses += 1
+            return self._value
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stat_checks": self.stat_checks,
+            "inotify": bool(self._watched),
+        }
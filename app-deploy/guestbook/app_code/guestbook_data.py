@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""Bulk export, import and synthetic seeding for the guestbook table.
+
+  export  stream the table to NDJSON or CSV in id order (constant memory)
+  import  load an export back, in batched multi-row INSERTs or via
+          LOAD DATA LOCAL INFILE, checkpointing the last id committed so
+          an interrupted run picks up where it stopped
+  seed    generate synthetic rows for load testing
+
+Connection settings default to what the app itself uses (DB_HOST,
+DB_PORT, DB_NAME and the VSO-written /secrets/db files), so inside a pod
+it runs with no flags:
+
+  python guestbook_data.py export --out /tmp/guestbook.ndjson
+  python guestbook_data.py import --in /tmp/guestbook.ndjson --checkpoint /tmp/import.ckpt
+  python guestbook_data.py seed --rows 5000000 --method load-data
+
+Timestamps are exported and imported in UTC.
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import mysql.connector
+
+SECRETS_DIR = os.environ.get("SECRETS_DIR", "/secrets")
+COLUMNS = ("id", "name", "message", "created_at")
+
+
+# -------------------
+# CLI
+# -------------------
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Export, import or seed the guestbook table")
+    p.add_argument("--host", default=os.environ.get("DB_HOST", "127.0.0.1"))
+    p.add_argument("--port", type=int, default=int(os.environ.get("DB_PORT", "3306")))
+    p.add_argument("--user", default=None, help="default: $SECRETS_DIR/db/username")
+    p.add_argument("--password", default=None, help="default: $SECRETS_DIR/db/password")
+    p.add_argument("--database", default=os.environ.get("DB_NAME"))
+    p.add_argument("--progress", type=float, default=5, help="Seconds between progress lines")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    e = sub.add_parser("export", help="Stream the table to NDJSON or CSV")
+    e.add_argument("--out", default="-", help="Output file (default: stdout)")
+    e.add_argument("--format", choices=["ndjson", "csv"], default=None,
+                   help="default: from the file extension, else ndjson")
+    e.add_argument("--since-id", type=int, default=0, help="Only rows with id > N (resume)")
+    e.add_argument("--batch", type=int, default=5000, help="Rows fetched per round trip")
+
+    i = sub.add_parser("import", help="Load an NDJSON or CSV export")
+    i.add_argument("--in", dest="src", default="-", help="Input file (default: stdin)")
+    i.add_argument("--format", choices=["ndjson", "csv"], default=None)
+    i.add_argument("--method", choices=["insert", "load-data"], default="insert")
+    i.add_argument("--batch", type=int, default=1000, help="Rows per INSERT / LOAD DATA chunk")
+    i.add_argument("--checkpoint", default=None,
+                   help="File holding the last id committed; rows up to it are skipped")
+    i.add_argument("--new-ids", action="store_true",
+                   help="Let AUTO_INCREMENT assign ids instead of keeping the exported ones "
+                        "(not resumable: can't be combined with --checkpoint)")
+
+    s = sub.add_parser("seed", help="Insert synthetic rows")
+    s.add_argument("--rows", type=int, required=True)
+    s.add_argument("--method", choices=["insert", "load-data"], default="insert")
+    s.add_argument("--batch", type=int, default=5000)
+    s.add_argument("--days", type=int, default=365,
+                   help="Spread created_at over the last N days (0 = now)")
+    args = p.parse_args(argv)
+    if args.command == "import" and args.new_ids and args.checkpoint:
+        # Only kept ids make a replayed batch a no-op (INSERT IGNORE); with
+        # new ids, a crash between commit and checkpoint would duplicate it.
+        p.error("--checkpoint needs the exported ids; drop --new-ids to resume safely")
+    return args
+
+
+# -------------------
+# MySQL
+# -------------------
+def read_secret(name):
+    with open(os.path.join(SECRETS_DIR, "db", name)) as f:
+        return f.read().strip()
+
+
+def connect(args, local_infile=False):
+    if not args.database:
+        raise SystemExit("No database: set DB_NAME or pass --database")
+    conn = mysql.connector.connect(
+        host=args.host,
+        port=args.port,
+        user=args.user or read_secret("username"),
+        password=args.password if args.password is not None else read_secret("password"),
+        database=args.database,
+        allow_local_infile=local_infile,
+        autocommit=False,
+    )
+    cur = conn.cursor()
+    cur.execute("SET time_zone = '+00:00'")
+    cur.close()
+    return conn
+
+
+class Progress:
+    """Prints rows and rows/s to stderr every ``interval`` seconds."""
+
+    def __init__(self, label, interval):
+        self.label = label
+        self.interval = interval
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._next = self.started + interval
+
+    def add(self, n, position=None):
+        self.rows += n
+        now = time.perf_counter()
+        if self.interval and now >= self._next:
+            self._next = now + self.interval
+            where = f" (id {position})" if position is not None else ""
+            print(f"[{self.label}] {self.rows} rows, {self.rate():.0f} rows/s{where}",
+                  file=sys.stderr)
+
+    def rate(self):
+        return self.rows / max(time.perf_counter() - self.started, 1e-9)
+
+    def done(self):
+        took = time.perf_counter() - self.started
+        print(f"[{self.label}] done: {self.rows} rows in {took:.1f}s ({self.rate():.0f} rows/s)",
+              file=sys.stderr)
+
+
+def guess_format(path, fmt):
+    if fmt:
+        return fmt
+    return "csv" if path.endswith(".csv") else "ndjson"
+
+
+def open_text(path, mode):
+    if path == "-":
+        return sys.stdout if "w" in mode else sys.stdin
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+# -------------------
+# Export
+# -------------------
+def export(args):
+    fmt = guess_format(args.out, args.format)
+    conn = connect(args)
+    # An unbuffered cursor streams rows off the socket as they are fetched,
+    # so memory stays at one batch however big the table is.
+    cur = conn.cursor(buffered=False)
+    cur.execute(
+        "SELECT id,name,message,created_at FROM guestbook WHERE id > %s ORDER BY id",
+        (args.since_id,)
+    )
+    progress = Progress("export", args.progress)
+    out = open_text(args.out, "w")
+    writer = csv.writer(out) if fmt == "csv" else None
+    if writer:
+        writer.writerow(COLUMNS)
+    last_id = args.since_id
+    try:
+        while True:
+            rows = cur.fetchmany(args.batch)
+            if not rows:
+                break
+            for entry_id, name, message, created_at in rows:
+                created = created_at.isoformat() if created_at else None
+                if writer:
+                    writer.writerow((entry_id, name, message, created or ""))
+                else:
+                    out.write(json.dumps(
+                        {"id": entry_id, "name": name, "message": message, "created_at": created},
+                        ensure_ascii=False, separators=(",", ":")
+                    ))
+                    out.write("\n")
+            last_id = rows[-1][0]
+            progress.add(len(rows), last_id)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        else:
+            out.flush()
+        cur.close()
+        conn.close()
+    progress.done()
+    print(f"[export] last id {last_id}", file=sys.stderr)
+
+
+# -------------------
+# Import
+# -------------------
+def read_records(src, fmt):
+    """Yield (id or None, name, message, created_at or None) per record."""
+    f = open_text(src, "r")
+    try:
+        if fmt == "csv":
+            for rec in csv.DictReader(f):
+                yield (int(rec["id"]) if rec.get("id") else None, rec["name"], rec["message"],
+                       rec.get("created_at") or None)
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                yield (rec.get("id"), rec["name"], rec["message"], rec.get("created_at"))
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return int(f.read().strip() or 0)
+
+
+def write_checkpoint(path, last_id):
+    if not path:
+        return
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(f"{last_id}\n")
+    os.replace(tmp, path)
+
+
+def batches(records, size):
+    batch = []
+    for rec in records:
+        batch.append(rec)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def insert_batch(cur, rows, keep_ids):
+    # executemany() folds these into a single multi-row INSERT. With the
+    # exported ids kept, IGNORE makes a batch replayed after a crash
+    # (committed, but not yet checkpointed) a no-op.
+    if keep_ids:
+        cur.executemany(
+            "INSERT IGNORE INTO guestbook (id,name,message,created_at) "
+            "VALUES (%s,%s,%s,COALESCE(%s,CURRENT_TIMESTAMP))",
+            rows
+        )
+    else:
+        cur.executemany(
+            "INSERT INTO guestbook (name,message,created_at) "
+            "VALUES (%s,%s,COALESCE(%s,CURRENT_TIMESTAMP))",
+            [r[1:] for r in rows]
+        )
+
+
+def load_data_batch(cur, rows, keep_ids):
+    # LOAD DATA needs a file; stage each chunk in a temp TSV.
+    with tempfile.NamedTemporaryFile("w", suffix=".tsv", encoding="utf-8",
+                                     newline="", delete=False) as f:
+        path = f.name
+        for entry_id, name, message, created_at in rows:
+            fields = ([entry_id] if keep_ids else []) + [name, message, created_at]
+            f.write("\t".join(_tsv(v) for v in fields))
+            f.write("\n")
+    try:
+        columns = "(id,name,message,@created_at)" if keep_ids else "(name,message,@created_at)"
+        cur.execute(
+            f"LOAD DATA LOCAL INFILE %s {'IGNORE' if keep_ids else ''} INTO TABLE guestbook "
+            f"CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+            f"LINES TERMINATED BY '\\n' {columns} "
+            "SET created_at = COALESCE(@created_at, CURRENT_TIMESTAMP)",
+            (path,)
+        )
+    finally:
+        os.remove(path)
+
+
+def _tsv(value):
+    if value is None:
+        return "\\N"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+def import_(args):
+    fmt = guess_format(args.src, args.format)
+    keep_ids = not args.new_ids
+    write = load_data_batch if args.method == "load-data" else insert_batch
+    resume = read_checkpoint(args.checkpoint)
+    if resume:
+        print(f"[import] resuming after id {resume}", file=sys.stderr)
+
+    conn = connect(args, local_infile=args.method == "load-data")
+    cur = conn.cursor()
+    progress = Progress("import", args.progress)
+    skipped = 0
+    last_id = resume
+    position = 0
+    for batch in batches(read_records(args.src, fmt), args.batch):
+        rows = []
+        for rec in batch:
+            # Records without an id (hand-written files) are checkpointed by
+            # their position in the file instead.
+            position += 1
+            key = rec[0] if rec[0] is not None else position
+            if key <= resume:
+                skipped += 1
+                continue
+            rows.append(rec)
+            last_id = key
+        if not rows:
+            continue
+        write(cur, rows, keep_ids)
+        conn.commit()
+        write_checkpoint(args.checkpoint, last_id)
+        progress.add(len(rows), last_id)
+    cur.close()
+    conn.close()
+    progress.done()
+    if skipped:
+        print(f"[import] skipped {skipped} rows already imported", file=sys.stderr)
+
+
+# -------------------
+# Seed
+# -------------------
+WORDS = ("hello", "vault", "secret", "rotate", "lease", "openshift", "guestbook",
+         "dynamic", "credentials", "tls", "certificate", "signed", "demo", "pod")
+
+
+def synthetic_rows(count, days):
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, microsecond=0)
+    span = days * 86400
+    for i in range(count):
+        created = now - datetime.timedelta(seconds=random.randint(0, span)) if span else None
+        message = " ".join(random.choices(WORDS, k=random.randint(3, 30)))
+        yield (None, f"seed-{i}", message, created.isoformat(sep=" ") if created else None)
+
+
+def seed(args):
+    write = load_data_batch if args.method == "load-data" else insert_batch
+    conn = connect(args, local_infile=args.method == "load-data")
+    cur = conn.cursor()
+    progress = Progress("seed", args.progress)
+    for batch in batches(synthetic_rows(args.rows, args.days), args.batch):
+        write(cur, batch, False)
+        conn.commit()
+        progress.add(len(batch))
+    cur.close()
+    conn.close()
+    progress.done()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    {"export": export, "import": import_, "seed": seed}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
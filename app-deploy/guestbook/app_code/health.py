@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+
+
+class HealthChecker:
+    """Runs dependency checks in the background and caches the results.
+
+    ``checks`` maps a name to a callable that returns a detail dict and
+    raises when the dependency is unhealthy. They run every ``interval``
+    seconds on one thread per process, so probes only read the last
+    results and never touch the database or re-parse files themselves.
+    """
+
+    def __init__(self, checks, interval=10.0, timeout=None):
+        self.checks = checks
+        self.interval = interval
+        # Liveness fails if the checker itself stops making progress.
+        self.timeout = timeout if timeout is not None else 3 * interval + 30
+        self._lock = threading.Lock()
+        self._results = {}
+        self._last_run = None
+        self._pid = None
+        self.started = time.monotonic()
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.started = time.monotonic()
+            self._last_run = None
+            self._results = {}
+            threading.Thread(target=self._loop, name="health-checker", daemon=True).start()
+
+    def _loop(self):
+        while True:
+            self.run_checks()
+            time.sleep(self.interval)
+
+    def run_checks(self):
+        results = {}
+        for name, check in self.checks.items():
+            started = time.perf_counter()
+            try:
+                detail = check() or {}
+                ok = True
+            except Exception as e:
+                detail = {"error": str(e)}
+                ok = False
+            results[name] = dict(detail, ok=ok,
+                                 took_ms=round((time.perf_counter() - started) * 1000, 1))
+            if not ok and self._results.get(name, {}).get("ok", True):
+                print(f"[health] {name} check failed: {detail['error']}")
+        with self._lock:
+            self._results = results
+            self._last_run = time.monotonic()
+
+    def live(self):
+        """(ok, detail): the process is up and the checker is still running."""
+        last = self._last_run
+        age = time.monotonic() - (last if last is not None else self.started)
+        return age < self.timeout, {"checker_age_s": round(age, 1)}
+
+    def ready(self):
+        """(ok, results): every check passed on the last run."""
+        with self._lock:
+            results, last = self._results, self._last_run
+        if last is None:
+            return False, {"status": "starting"}
+        ok = all(r["ok"] for r in results.values())
+        return ok, {
+            "status": "ok" if ok else "unavailable",
+            "checked_s_ago": round(time.monotonic() - last, 1),
+            "checks": results,
+        }
@@ -6,4 +6,16 @@ CREATE TABLE IF NOT EXISTS guestbook (
     name       VARCHAR(100) NOT NULL,
     message    TEXT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+);
+
+-- Full-text index for /search. Idempotent so it can be re-run against
+-- existing deployments: only adds the index when it is missing.
+SET @has_ft := (SELECT COUNT(*) FROM information_schema.statistics
+                WHERE table_schema = DATABASE() AND table_name = 'guestbook'
+                  AND index_name = 'ft_name_message');
+SET @ddl := IF(@has_ft = 0,
+               'ALTER TABLE guestbook ADD FULLTEXT INDEX ft_name_message (name, message)',
+               'DO 0');
+PREPARE stmt FROM @ddl;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
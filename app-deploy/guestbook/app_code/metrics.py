@@ -0,0 +1,273 @@
+"""Prometheus metrics for the guestbook app.
+
+Hot-path metrics (request counts, phase latencies, rows fetched) are
+observed inline on pre-bound children. Pool, cache and queue figures are
+copied from their ``stats()`` dicts by a sampler thread every
+METRICS_SAMPLE_INTERVAL seconds, so they cost nothing per request.
+
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn with several workers) the
+/metrics output aggregates all workers of the pod.
+"""
+import os
+import socket
+import threading
+import time
+from functools import wraps
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+    REGISTRY, generate_latest, multiprocess,
+)
+
+POD     = os.environ.get("POD_NAME", socket.gethostname())
+RELEASE = os.environ.get("RELEASE_NAME", "")
+SAMPLE_INTERVAL = float(os.environ.get("METRICS_SAMPLE_INTERVAL", "5"))
+MULTIPROC = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+BASE = ("pod", "release")
+
+REQUESTS = Counter(
+    "guestbook_requests_total", "HTTP requests handled",
+    BASE + ("method", "status"),
+)
+REQUEST_SECONDS = Histogram(
+    "guestbook_request_duration_seconds", "End-to-end request latency",
+    BASE + ("method",),
+    buckets=(.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5),
+)
+PHASE_SECONDS = Histogram(
+    "guestbook_phase_duration_seconds", "Latency of each phase inside a request",
+    BASE + ("phase",),
+    buckets=(.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, 1),
+)
+ROWS_FETCHED = Histogram(
+    "guestbook_rows_fetched", "Rows fetched from MySQL per page read",
+    BASE,
+    buckets=(0, 1, 5, 10, 25, 50, 100, 200, 500),
+)
+POOL_CONNECTIONS = Gauge(
+    "guestbook_db_pool_connections", "DB pool connections by state",
+    BASE + ("pool", "state"), multiprocess_mode="livesum",
+)
+POOL_OPENED = Counter(
+    "guestbook_db_pool_opened_total", "DB connections opened by the pool",
+    BASE + ("pool",),
+)
+POOL_ROTATIONS = Counter(
+    "guestbook_db_pool_rotations_total", "Credential rotations seen by the pool",
+    BASE + ("pool",),
+)
+FILE_RELOADS = Counter(
+    "guestbook_file_reloads_total", "Secret/cert files re-read after a change",
+    BASE + ("cache",),
+)
+FILE_CACHE_HITS = Counter(
+    "guestbook_file_cache_hits_total", "Secret/cert reads served from memory",
+    BASE + ("cache",),
+)
+PAGE_CACHE_LOOKUPS = Counter(
+    "guestbook_page_cache_total", "Rendered-page cache lookups",
+    BASE + ("result",),
+)
+WRITE_QUEUE_PENDING = Gauge(
+    "guestbook_write_queue_pending", "Entries waiting in the write-behind queue",
+    BASE, multiprocess_mode="livesum",
+)
+WRITE_QUEUE_ROWS = Counter(
+    "guestbook_write_queue_rows_total", "Write-behind rows by outcome",
+    BASE + ("result",),
+)
+ADMISSION = Counter(
+    "guestbook_admission_total", "Admission decisions by outcome",
+    BASE + ("result",),
+)
+IN_FLIGHT = Gauge(
+    "guestbook_requests_in_flight", "Requests running or queued for a slot",
+    BASE + ("state",), multiprocess_mode="livesum",
+)
+RATE_LIMIT = Counter(
+    "guestbook_rate_limit_total", "Per-client POST rate-limit decisions",
+    BASE + ("result",),
+)
+TLS_HANDSHAKES = Counter(
+    "guestbook_tls_handshakes_total", "TLS handshakes by outcome (full, resumed, failed)",
+    BASE + ("result",),
+)
+TLS_RELOADS = Counter(
+    "guestbook_tls_reloads_total", "Key pair reloads after /tls rotated",
+    BASE + ("result",),
+)
+STARTUP_SECONDS = Gauge(
+    "guestbook_startup_seconds", "Time spent starting a worker, by step",
+    BASE + ("step",), multiprocess_mode="max",
+)
+
+_phases = {}
+_rows = ROWS_FETCHED.labels(POD, RELEASE)
+
+
+def observe_phase(phase, seconds):
+    child = _phases.get(phase)
+    if child is None:
+        child = _phases[phase] = PHASE_SECONDS.labels(POD, RELEASE, phase)
+    child.observe(seconds)
+
+
+class phase:
+    """``with phase("render"): ...`` records the block's duration."""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        observe_phase(self.name, time.perf_counter() - self.start)
+
+
+def timed(name, fn):
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with phase(name):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def observe_rows(n):
+    _rows.observe(n)
+
+
+def observe_startup(step, seconds):
+    STARTUP_SECONDS.labels(POD, RELEASE, step).set(seconds)
+
+
+def observe_request(method, status, seconds):
+    REQUESTS.labels(POD, RELEASE, method, str(status)).inc()
+    REQUEST_SECONDS.labels(POD, RELEASE, method).observe(seconds)
+
+
+# ─── Sampled sources ─────────────────────────────────────────────────
+_pools = {}
+_caches = []
+_page_caches = []
+_write_queues = []
+_limiters = []
+_rate_limiters = []
+_tls_contexts = []
+_last = {}
+_sample_lock = threading.Lock()
+_sampler_pid = None
+_sampler_lock = threading.Lock()
+
+
+def watch_pool(name, pool):
+    _pools[name] = pool
+
+
+def watch_file_cache(cache):
+    _caches.append(cache)
+
+
+def watch_page_cache(cache):
+    _page_caches.append(cache)
+
+
+def watch_write_queue(queue):
+    _write_queues.append(queue)
+
+
+def watch_admission(limiter):
+    _limiters.append(limiter)
+
+
+def watch_rate_limiter(limiter):
+    _rate_limiters.append(limiter)
+
+
+def watch_tls(ctx):
+    _tls_contexts.append(ctx)
+
+
+def _delta(key, value):
+    # Sources keep running totals; counters want increments.
+    prev = _last.get(key, 0)
+    _last[key] = value
+    return max(value - prev, 0)
+
+
+def sample():
+    with _sample_lock:
+        _sample()
+
+
+def _sample():
+    for name, pool in _pools.items():
+        stats = pool.stats()
+        for state in ("in_use", "idle", "waiting"):
+            POOL_CONNECTIONS.labels(POD, RELEASE, name, state).set(stats[state])
+        POOL_OPENED.labels(POD, RELEASE, name).inc(_delta(("opened", name), stats["opened"]))
+        POOL_ROTATIONS.labels(POD, RELEASE, name).inc(_delta(("rotations", name), stats["rotations"]))
+    for cache in _caches:
+        stats = cache.stats()
+        FILE_RELOADS.labels(POD, RELEASE, cache.name).inc(_delta(("reload", cache.name), stats["misses"]))
+        FILE_CACHE_HITS.labels(POD, RELEASE, cache.name).inc(_delta(("hit", cache.name), stats["hits"]))
+    for i, cache in enumerate(_page_caches):
+        stats = cache.stats()
+        for result, key in (("hit", "hits"), ("miss", "misses")):
+            PAGE_CACHE_LOOKUPS.labels(POD, RELEASE, result).inc(_delta(("page", i, key), stats[key]))
+    for i, queue in enumerate(_write_queues):
+        stats = queue.stats()
+        WRITE_QUEUE_PENDING.labels(POD, RELEASE).set(stats["pending"])
+        for result in ("flushed", "rejected", "failed"):
+            WRITE_QUEUE_ROWS.labels(POD, RELEASE, result).inc(_delta(("wq", i, result), stats[result]))
+    for i, limiter in enumerate(_limiters):
+        stats = limiter.stats()
+        for state in ("in_flight", "waiting"):
+            IN_FLIGHT.labels(POD, RELEASE, state).set(stats[state])
+        for result in ("admitted", "queued", "shed", "timed_out"):
+            ADMISSION.labels(POD, RELEASE, result).inc(_delta(("adm", i, result), stats[result]))
+    for i, limiter in enumerate(_rate_limiters):
+        stats = limiter.stats()
+        for result in ("allowed", "limited"):
+            RATE_LIMIT.labels(POD, RELEASE, result).inc(_delta(("rl", i, result), stats[result]))
+    for i, ctx in enumerate(_tls_contexts):
+        stats = ctx.stats()
+        for result in ("full", "resumed", "failed"):
+            TLS_HANDSHAKES.labels(POD, RELEASE, result).inc(_delta(("tls", i, result), stats[result]))
+        for result, key in (("ok", "reloads"), ("failed", "reload_errors")):
+            TLS_RELOADS.labels(POD, RELEASE, result).inc(_delta(("tlsr", i, key), stats[key]))
+
+
+def _sample_loop():
+    while True:
+        try:
+            sample()
+        except Exception as e:
+            print(f"[metrics] sample failed: {e}")
+        time.sleep(SAMPLE_INTERVAL)
+
+
+def ensure_sampler():
+    global _sampler_pid
+    if _sampler_pid == os.getpid():
+        return
+    with _sampler_lock:
+        if _sampler_pid == os.getpid():
+            return
+        _sampler_pid = os.getpid()
+        _last.clear()
+        threading.Thread(target=_sample_loop, name="metrics-sampler", daemon=True).start()
+
+
+def render():
+    """Return (body, content_type) for the /metrics endpoint."""
+    sample()
+    if MULTIPROC:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,75 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class PageCache:
+    """LRU of rendered pages, invalidated by a ``MAX(id)`` watermark.
+
+    ``watermark_fn()`` is called at most once every ``ttl`` seconds per
+    process, so repeat reads in between never touch the database. Inserts
+    made by this process call ``bump()`` to force a fresh watermark on the
+    next read; inserts made by other replicas show up within ``ttl``.
+    """
+
+    def __init__(self, watermark_fn, ttl=1.0, max_entries=128):
+        self._watermark_fn = watermark_fn
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pages = OrderedDict()  # key -> (version, body, etag)
+        self._lock = threading.Lock()
+        self._wm_lock = threading.Lock()
+        self._wm = None
+        self._wm_expires = 0.0
+        self._bumps = 0
+        self.hits = 0
+        self.misses = 0
+        self.watermark_queries = 0
+
+    def bump(self):
+        self._bumps += 1
+        self._wm_expires = 0.0
+
+    def watermark(self):
+        if time.monotonic() < self._wm_expires:
+            return self._wm
+        with self._wm_lock:
+            # Another thread may have refreshed it while we waited.
+            if time.monotonic() < self._wm_expires:
+                return self._wm
+            bumps = self._bumps
+            wm = self._watermark_fn()
+            self.watermark_queries += 1
+            self._wm = wm
+            # A bump that raced with the query means wm may already be old.
+            if bumps == self._bumps:
+                self._wm_expires = time.monotonic() + self.ttl
+            return wm
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._pages.get(key)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._pages.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key, version, body):
+        etag = hashlib.sha256(body.encode()).hexdigest()[:32]
+        with self._lock:
+            self._pages[key] = (version, body, etag)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+        return body, etag
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._pages),
+            "watermark_queries": self.watermark_queries,
+        }
@@ -0,0 +1,81 @@
+"""Startup checks run by server.py before any worker is started.
+
+Everything the app needs from its environment is checked up front, so a
+misconfigured pod fails at once with a readable list of problems instead
+of a traceback on its first request. VSO may still be writing the secret
+volumes when the container starts, so missing files are waited for (up to
+PREFLIGHT_WAIT seconds) before they count as errors.
+"""
+import os
+import ssl
+import time
+
+PREFLIGHT_WAIT = float(os.environ.get("PREFLIGHT_WAIT", "30"))
+
+
+class ConfigError(Exception):
+    """One or more startup checks failed."""
+
+
+def required_files():
+    tls_dir = os.environ.get("TLS_DIR", "/tls")
+    secrets_dir = os.environ.get("SECRETS_DIR", "/secrets")
+    return {
+        "DB username": os.path.join(secrets_dir, "db", "username"),
+        "DB password": os.path.join(secrets_dir, "db", "password"),
+        "TLS certificate": os.path.join(tls_dir, "tls.crt"),
+        "TLS key": os.path.join(tls_dir, "tls.key"),
+    }
+
+
+def wait_for_files(files, timeout):
+    """Return the labels of files still missing or empty after ``timeout``."""
+    deadline = time.monotonic() + timeout
+    while True:
+        missing = [label for label, path in files.items() if not _has_content(path)]
+        if not missing or time.monotonic() >= deadline:
+            return missing
+        time.sleep(0.1)
+
+
+def _has_content(path):
+    try:
+        return os.path.getsize(path) > 0
+    except OSError:
+        return False
+
+
+def run(wait=PREFLIGHT_WAIT):
+    """Validate env and files; raise ConfigError listing every problem."""
+    started = time.perf_counter()
+    problems = []
+    if not os.environ.get("DB_NAME"):
+        problems.append("DB_NAME is not set")
+
+    files = required_files()
+    for label in wait_for_files(files, wait):
+        problems.append(f"{label} missing or empty: {files[label]}")
+
+    cert, key = files["TLS certificate"], files["TLS key"]
+    if not any(label.startswith("TLS") for label in problems):
+        try:
+            ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER).load_cert_chain(cert, key)
+        except (OSError, ssl.SSLError) as e:
+            problems.append(f"TLS certificate/key do not load: {e}")
+
+    config_dir = os.path.join(os.environ.get("SECRETS_DIR", "/secrets"), "config")
+    if not os.path.isdir(config_dir):
+        print(f"[preflight] {config_dir} not found, Vault config will be empty")
+
+    if problems:
+        raise ConfigError("; ".join(problems))
+    return time.perf_counter() - started
+
+
+def warm_imports():
+    """Import the heavy libraries once, before gunicorn forks its workers."""
+    started = time.perf_counter()
+    import mysql.connector  # noqa: F401
+    from cryptography import x509  # noqa: F401
+    import flask  # noqa: F401
+    return time.perf_counter() - started
@@ -0,0 +1,154 @@
+"""Sampling profiler for individual requests.
+
+A request is profiled when it carries ``X-Profile: <token>`` or falls in
+the configured sample percentage. While any request is being profiled
+one background thread snapshots the stacks of the threads serving them
+every few milliseconds; the result is written in the collapsed-stack
+format ("frame;frame;frame count" per line) that flamegraph.pl,
+speedscope and inferno read directly.
+
+Nothing here is imported or hooked into the app unless PROFILING=1.
+"""
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from functools import lru_cache
+
+HEADER = "X-Profile"
+
+
+@lru_cache(maxsize=None)
+def _label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class Profile:
+    def __init__(self, name, method, path):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.started = time.time()
+        self.seconds = None
+        self.status = None
+        self.samples = 0
+        self.stacks = Counter()
+
+    def add(self, frame):
+        stack = []
+        while frame is not None:
+            stack.append(_label(frame.f_code))
+            frame = frame.f_back
+        self.stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def folded(self):
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def summary(self):
+        return {
+            "name": self.name,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "seconds": self.seconds,
+            "samples": self.samples,
+        }
+
+
+class RequestProfiler:
+    """Decides which requests to profile and samples their threads.
+
+    ``token`` enables header-triggered profiles and guards the admin
+    endpoints; ``sample_percent`` profiles that share of all requests.
+    Finished profiles are kept in memory (the last ``keep``) and, if
+    ``out_dir`` is set, written there as ``<name>.folded``.
+    """
+
+    def __init__(self, token="", sample_percent=0.0, out_dir="", keep=20, interval=0.005):
+        self.token = token
+        self.sample_percent = sample_percent
+        self.out_dir = out_dir
+        self.interval = interval
+        self._active = {}  # thread ident -> Profile
+        self._done = deque(maxlen=keep)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pid = None
+        self._seq = 0
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+
+    def authorized(self, req):
+        supplied = req.headers.get(HEADER, "")
+        return bool(self.token) and hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    def start(self, req):
+        """Start profiling the current request if it asked for it or was sampled."""
+        if not (self.authorized(req) or
+                (self.sample_percent and random.random() * 100 < self.sample_percent)):
+            return None
+        self._ensure_sampler()
+        with self._lock:
+            self._seq += 1
+            name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{self._seq}"
+            profile = Profile(name, req.method, req.path)
+            self._active[threading.get_ident()] = profile
+        self._wake.set()
+        return profile
+
+    def finish(self, profile, status=None):
+        with self._lock:
+            self._active.pop(threading.get_ident(), None)
+            profile.seconds = round(time.time() - profile.started, 4)
+            profile.status = status
+            self._done.append(profile)
+        if self.out_dir:
+            path = os.path.join(self.out_dir, f"{profile.name}.folded")
+            try:
+                with open(path, "w") as f:
+                    f.write(profile.folded())
+            except OSError as e:
+                print(f"[profiler] could not write {path}: {e}")
+        print(f"[profiler] {profile.method} {profile.path} {profile.seconds}s "
+              f"{profile.samples} samples -> {profile.name}")
+
+    def _ensure_sampler(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="profiler", daemon=True).start()
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, profile in active:
+                    frame = frames.get(ident)
+                    if frame is not None and self._active.get(ident) is profile:
+                        profile.add(frame)
+            del frames
+            time.sleep(self.interval)
+
+    def profiles(self):
+        with self._lock:
+            return [p.summary() for p in reversed(self._done)]
+
+    def get(self, name):
+        with self._lock:
+            for p in self._done:
+                if p.name == name:
+                    return p
+        return None
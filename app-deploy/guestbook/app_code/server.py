@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Container entrypoint: serve the guestbook app over TLS.
+
+SERVER_MODE selects how:
+  threaded  gunicorn gthread workers (WEB_WORKERS x WEB_THREADS)  [default]
+  prefork   gunicorn sync workers, one request per process
+  dev       Flask's single-process development server
+"""
+import math
+import os
+
+import preflight
+
+TLS_DIR   = os.environ.get("TLS_DIR", "/tls")
+CERT_FILE = os.path.join(TLS_DIR, "tls.crt")
+KEY_FILE  = os.path.join(TLS_DIR, "tls.key")
+
+SERVER_MODE = os.environ.get("SERVER_MODE", "threaded")
+PORT        = int(os.environ.get("PORT", "5000"))
+TLS_SESSION_TICKETS = int(os.environ.get("TLS_SESSION_TICKETS", "2"))
+# With no CPU limit the affinity mask is the whole node. Every worker has
+# its own DB pool, so size for at most this many CPUs in that case.
+UNLIMITED_CPUS = int(os.environ.get("WEB_UNLIMITED_CPUS", "4"))
+
+
+def cpu_quota():
+    """The cgroup CPU quota rounded up to whole CPUs, or None if unlimited."""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        quota, period = open("/sys/fs/cgroup/cpu.max").read().split()
+        if quota != "max":
+            return max(1, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            quota = int(open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read())
+            period = int(open("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read())
+            if quota > 0:
+                return max(1, math.ceil(quota / period))
+        except (OSError, ValueError):
+            pass
+    return None
+
+
+def cpu_limit():
+    """CPUs to size workers for: the cgroup quota, else a capped CPU count."""
+    quota = cpu_quota()
+    if quota:
+        return quota
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    if cpus > UNLIMITED_CPUS:
+        print(f"[server] no cgroup CPU limit; sizing workers for {UNLIMITED_CPUS} of {cpus} CPUs "
+              "(set resources.limits.cpu or WEB_WORKERS to change)")
+    return min(cpus, UNLIMITED_CPUS)
+
+
+def worker_count(mode, cpus):
+    if os.environ.get("WEB_WORKERS"):
+        return int(os.environ["WEB_WORKERS"])
+    if mode == "prefork":
+        return 2 * cpus + 1
+    return cpus
+
+
+_tls = None
+
+def tls_context():
+    global _tls
+    if _tls is None:
+        from tls import ReloadingSSLContext
+        _tls = ReloadingSSLContext(CERT_FILE, KEY_FILE, num_tickets=TLS_SESSION_TICKETS)
+    return _tls
+
+
+def ssl_context(conf, default_ssl_context_factory):
+    # gunicorn calls this for every accepted connection; hand back one
+    # long-lived context that reloads itself when /tls rotates.
+    return tls_context().get()
+
+
+def post_worker_init(worker):
+    # The app is loaded by now; get it ready before the first request.
+    import metrics
+    from app import warm_up
+    metrics.watch_tls(tls_context())
+    warm_up()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def reset_metrics_dir():
+    # Multi-worker /metrics aggregates per-worker files from this dir;
+    # start every pod from an empty one.
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        os.remove(os.path.join(path, name))
+
+
+def run_gunicorn(mode):
+    from gunicorn.app.base import BaseApplication
+
+    cpus = cpu_limit()
+    options = {
+        "bind": f"0.0.0.0:{PORT}",
+        "workers": worker_count(mode, cpus),
+        "worker_class": "gthread" if mode == "threaded" else "sync",
+        "threads": int(os.environ.get("WEB_THREADS", "8")) if mode == "threaded" else 1,
+        "timeout": int(os.environ.get("WEB_TIMEOUT", "30")),
+        "graceful_timeout": int(os.environ.get("WEB_GRACEFUL_TIMEOUT", "30")),
+        "keepalive": int(os.environ.get("WEB_KEEPALIVE", "5")),
+        "certfile": CERT_FILE,
+        "keyfile": KEY_FILE,
+        "ssl_context": ssl_context,
+        # Handshake in wrap_socket() so every worker type goes through the
+        # counting SSLSocket.do_handshake().
+        "do_handshake_on_connect": True,
+        "post_worker_init": post_worker_init,
+    }
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        reset_metrics_dir()
+        options["child_exit"] = child_exit
+
+    class GuestbookServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # Imported in each worker after fork, so DB pools and watcher
+            # threads are never shared between processes.
+            from app import app
+            return app
+
+    # Workers are forked from this process, so libraries imported here are
+    # already in memory when each of them loads the app, and all of them
+    # share this context's session ticket keys.
+    imports = preflight.warm_imports()
+    tls_context().get()
+    print(f"[server] mode={mode} cpus={cpus} workers={options['workers']} "
+          f"threads={options['threads']} library_imports={imports * 1000:.0f}ms")
+    GuestbookServer().run()
+
+
+def main():
+    try:
+        took = preflight.run()
+    except preflight.ConfigError as e:
+        raise SystemExit(f"[preflight] {e}")
+    print(f"[preflight] ok in {took * 1000:.0f}ms")
+    if SERVER_MODE == "dev":
+        import metrics
+        from app import app, warm_up
+        ctx = tls_context()
+        ctx.get()
+        ctx.watch()
+        metrics.watch_tls(ctx)
+        warm_up()
+        app.run(host="0.0.0.0", port=PORT, ssl_context=ctx.context)
+    elif SERVER_MODE in ("threaded", "prefork"):
+        run_gunicorn(SERVER_MODE)
+    else:
+        raise SystemExit(f"Unknown SERVER_MODE {SERVER_MODE!r} (threaded, prefork, dev)")
+
+
+if __name__ == "__main__":
+    main()
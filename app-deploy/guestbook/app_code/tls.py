@@ -0,0 +1,128 @@
+import os
+import ssl
+import threading
+import time
+
+from file_cache import FileCache
+
+
+class HandshakeStats:
+    """Thread-safe counts of full, resumed and failed TLS handshakes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"full": 0, "resumed": 0, "failed": 0}
+
+    def count(self, result):
+        with self._lock:
+            self.counts[result] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.counts)
+
+
+class ReloadingSSLContext:
+    """Server-side SSLContext that follows VSO rotating the key pair in /tls.
+
+    The same SSLContext object is kept for the life of the process and the
+    new pair is loaded into it in place, so connections that are already
+    established keep going and new handshakes get the new cert. Keeping
+    the context also keeps its session ticket keys, so clients resume
+    across cert rotations; build it before forking workers and they all
+    share the keys too.
+    """
+
+    def __init__(self, cert_file, key_file, check_interval=1.0, num_tickets=2):
+        self.cert_file = cert_file
+        self.key_file = key_file
+        self.check_interval = check_interval
+        self.context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        # TLS 1.3 tickets handed out per full handshake (0 disables them).
+        self.context.num_tickets = num_tickets
+        if num_tickets:
+            self.context.options &= ~ssl.OP_NO_TICKET
+        else:
+            self.context.options |= ssl.OP_NO_TICKET
+        self.handshakes = HandshakeStats()
+        self.context.sslsocket_class = _counting_socket(self.handshakes)
+        self.loaded = False
+        # Rotations picked up after the first load. The first load happens
+        # in the gunicorn master and isn't counted, so forked workers don't
+        # each report it again.
+        self.reloads = 0
+        self.reload_errors = 0
+        self._retry_at = 0.0
+        self._cache = FileCache(
+            "tls", [cert_file, key_file], self._load, check_interval=check_interval
+        )
+
+    def _snapshot(self):
+        # VSO swaps the ..data symlink to publish tls.crt and tls.key
+        # together. Resolve both through the same swap so we never pair a
+        # new cert with an old key.
+        for _ in range(3):
+            cert = os.path.realpath(self.cert_file)
+            key = os.path.realpath(self.key_file)
+            if os.path.dirname(cert) == os.path.dirname(key):
+                break
+        return cert, key
+
+    def _load(self):
+        cert, key = self._snapshot()
+        # Check the pair in a scratch context first: a failed load can leave
+        # the live one with a cert that doesn't match its key.
+        ssl.create_default_context(ssl.Purpose.CLIENT_AUTH).load_cert_chain(cert, key)
+        self.context.load_cert_chain(cert, key)
+        if self.loaded:
+            self.reloads += 1
+            print(f"[tls] reloaded key pair from {cert} (reload #{self.reloads})")
+        else:
+            self.loaded = True
+            print(f"[tls] loaded key pair from {cert}")
+        return self.context
+
+    def get(self):
+        if self.loaded and time.monotonic() < self._retry_at:
+            return self.context
+        try:
+            return self._cache.get()
+        except (OSError, ssl.SSLError, ValueError) as e:
+            if not self.loaded:
+                raise
+            # Half-written pair: keep serving the old one and retry shortly
+            # instead of on every handshake.
+            self.reload_errors += 1
+            self._retry_at = time.monotonic() + self.check_interval
+            print(f"[tls] reload failed, keeping previous key pair: {e}")
+            return self.context
+
+    def watch(self):
+        """Reload in a background thread, for servers that never call get()."""
+        def loop():
+            while True:
+                time.sleep(self.check_interval)
+                self.get()
+        threading.Thread(target=loop, name="tls-reload", daemon=True).start()
+
+    def stats(self):
+        return dict(
+            self.handshakes.snapshot(),
+            reloads=self.reloads,
+            reload_errors=self.reload_errors,
+        )
+
+
+def _counting_socket(stats):
+    class CountingSSLSocket(ssl.SSLSocket):
+        def do_handshake(self, block=False):
+            try:
+                super().do_handshake(block)
+            except (ssl.SSLWantReadError, ssl.SSLWantWriteError):
+                raise
+            except (OSError, ValueError):
+                stats.count("failed")
+                raise
+            stats.count("resumed" if self.session_reused else "full")
+
+    return CountingSSLSocket
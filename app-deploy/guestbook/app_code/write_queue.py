@@ -0,0 +1,117 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+
+class QueueFull(Exception):
+    """Raised when the write-behind queue stays full past the submit timeout."""
+
+
+class WriteBehindQueue:
+    """Buffers rows in-process and hands them to ``flush(rows)`` in batches.
+
+    A batch is flushed once it reaches ``max_batch`` rows or its oldest row
+    has waited ``max_delay`` seconds, whichever comes first. The queue holds
+    at most ``max_queue`` rows; ``submit`` blocks for up to ``put_timeout``
+    seconds and then raises QueueFull. Anything still queued is flushed at
+    interpreter exit.
+    """
+
+    def __init__(self, flush, max_batch=100, max_delay=0.5, max_queue=1000,
+                 put_timeout=0.5, retries=3):
+        self._flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self.submitted = 0
+        self.flushed = 0
+        self.batches = 0
+        self.rejected = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="write-behind", daemon=True
+            )
+            self._thread.start()
+            self._pid = os.getpid()
+            atexit.register(self.close)
+
+    def submit(self, row):
+        self._ensure_started()
+        try:
+            self._queue.put(row, timeout=self.put_timeout)
+        except queue.Full:
+            self.rejected += 1
+            raise QueueFull(f"write queue full ({self._queue.maxsize} pending)")
+        self.submitted += 1
+
+    def _collect(self):
+        # Block for the first row, then gather until size or age limit.
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 and not self._stopping:
+                break
+            try:
+                batch.append(self._queue.get(timeout=max(remaining, 0)))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        for attempt in range(1, self.retries + 1):
+            try:
+                self._flush(batch)
+            except Exception as e:
+                print(f"[write_queue] flush of {len(batch)} rows failed "
+                      f"(attempt {attempt}/{self.retries}): {e}")
+                time.sleep(min(0.2 * 2 ** attempt, 2))
+                continue
+            self.flushed += len(batch)
+            self.batches += 1
+            return
+        self.failed += len(batch)
+        print(f"[write_queue] dropped {len(batch)} rows after {self.retries} attempts")
+
+    def _run(self):
+        while not (self._stopping and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def close(self, timeout=10):
+        if self._pid != os.getpid() or self._stopping:
+            return
+        self._stopping = True
+        pending = self._queue.qsize()
+        self._thread.join(timeout)
+        if pending:
+            print(f"[write_queue] flushed {pending} pending rows on shutdown")
+
+    def stats(self):
+        return {
+            "pending": self._queue.qsize(),
+            "submitted": self.submitted,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "failed": self.failed,
+        }
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""Local load test for the guestbook app.
+
+Creates throwaway /secrets and /tls fixtures, seeds a MySQL database,
+starts app_code/server.py against it and drives a read/write mix at a
+fixed concurrency. Results (latency percentiles, throughput, MySQL
+connections opened) are printed and written as JSON so runs can be
+compared with --compare.
+
+Any MySQL 8 compatible server works (MySQL, MariaDB, Percona); pass its
+address with --mysql-host/--mysql-port, or use --start-mysql to run a
+throwaway mysql:8 container with podman or docker.
+"""
+import argparse
+import datetime
+import http.client
+import json
+import os
+import random
+import shutil
+import signal
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+import mysql.connector
+
+HERE = Path(__file__).resolve().parent
+APP_DIR = HERE.parent / "app_code"
+
+
+# -------------------
+# CLI
+# -------------------
+def parse_args():
+    p = argparse.ArgumentParser(description="Benchmark the guestbook app locally")
+    p.add_argument("--mysql-host", default="127.0.0.1")
+    p.add_argument("--mysql-port", type=int, default=3306)
+    p.add_argument("--mysql-user", default="root")
+    p.add_argument("--mysql-password", default=os.getenv("MYSQL_PWD", "bench"))
+    p.add_argument("--database", default="guestbook_bench")
+    p.add_argument("--start-mysql", action="store_true",
+                   help="Start a throwaway mysql:8 container (podman or docker)")
+    p.add_argument("--seed", type=int, default=10000,
+                   help="Rows to seed before the run (0 keeps existing data)")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--duration", type=float, default=30, help="Seconds of load")
+    p.add_argument("--warmup", type=float, default=3, help="Seconds excluded from results")
+    p.add_argument("--write-ratio", type=float, default=0.1,
+                   help="Fraction of requests that POST a new entry")
+    p.add_argument("--read-path", default="/", help="Path used for reads")
+    p.add_argument("--port", type=int, default=5443)
+    p.add_argument("--server-mode", default="threaded", choices=["threaded", "prefork", "dev"])
+    p.add_argument("--workers", default="", help="WEB_WORKERS for the app (default: auto)")
+    p.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                   help="Extra environment for the app (repeatable)")
+    p.add_argument("--out", default="bench_results.json")
+    p.add_argument("--compare", help="Previous results JSON to compare against")
+    p.add_argument("--max-regression", type=float, default=10.0,
+                   help="Fail if p95 or throughput regress by more than this percent")
+    return p.parse_args()
+
+
+# -------------------
+# Fixtures
+# -------------------
+def write_tls(tls_dir):
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    (tls_dir / "tls.key").write_bytes(key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+    (tls_dir / "tls.crt").write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+
+
+def make_fixtures(root, args):
+    secrets = root / "secrets"
+    (secrets / "db").mkdir(parents=True)
+    (secrets / "config").mkdir()
+    (secrets / "db" / "username").write_text(args.mysql_user)
+    (secrets / "db" / "password").write_text(args.mysql_password)
+    (secrets / "config" / "message").write_text("Hello from the benchmark")
+    (secrets / "config" / "supersecretpassword").write_text("bench")
+    tls = root / "tls"
+    tls.mkdir()
+    write_tls(tls)
+    return secrets, tls
+
+
+# -------------------
+# MySQL
+# -------------------
+def start_mysql(args):
+    runtime = shutil.which("podman") or shutil.which("docker")
+    if not runtime:
+        sys.exit("--start-mysql needs podman or docker on PATH")
+    name = f"guestbook-bench-{os.getpid()}"
+    subprocess.run([
+        runtime, "run", "-d", "--rm", "--name", name,
+        "-e", f"MYSQL_ROOT_PASSWORD={args.mysql_password}",
+        "-p", f"{args.mysql_port}:3306", "docker.io/library/mysql:8",
+    ], check=True, stdout=subprocess.DEVNULL)
+    print(f"Started {name}; waiting for MySQL...")
+    return runtime, name
+
+
+def connect(args, database=None):
+    return mysql.connector.connect(
+        host=args.mysql_host, port=args.mysql_port,
+        user=args.mysql_user, password=args.mysql_password,
+        database=database, autocommit=True,
+    )
+
+
+def wait_for_mysql(args, timeout=120):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            connect(args).close()
+            return
+        except mysql.connector.Error:
+            if time.time() > deadline:
+                raise
+            time.sleep(2)
+
+
+def schema_statements():
+    # Reuse the app's own bootstrap, minus its hard-coded database.
+    sql = (APP_DIR / "init.sql").read_text()
+    for stmt in sql.split(";"):
+        stmt = stmt.strip()
+        if stmt and not stmt.upper().startswith(("CREATE DATABASE", "USE ")):
+            yield stmt
+
+
+def seed(args):
+    conn = connect(args)
+    cur = conn.cursor()
+    cur.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+    cur.execute(f"USE `{args.database}`")
+    for stmt in schema_statements():
+        cur.execute(stmt)
+    if args.seed:
+        cur.execute("TRUNCATE TABLE guestbook")
+        start = time.time()
+        batch = 1000
+        for offset in range(0, args.seed, batch):
+            rows = [
+                (f"bench-{i}", f"Synthetic message {i} " + "x" * random.randint(10, 200))
+                for i in range(offset, min(offset + batch, args.seed))
+            ]
+            cur.executemany("INSERT INTO guestbook (name,message) VALUES (%s,%s)", rows)
+        print(f"Seeded {args.seed} rows in {time.time() - start:.1f}s")
+    cur.close()
+    conn.close()
+
+
+def connections_opened(args):
+    conn = connect(args)
+    cur = conn.cursor()
+    cur.execute("SHOW GLOBAL STATUS LIKE 'Connections'")
+    value = int(cur.fetchone()[1])
+    cur.close()
+    conn.close()
+    return value
+
+
+# -------------------
+# App
+# -------------------
+def start_app(args, secrets, tls, log_path):
+    env = dict(os.environ)
+    env.update({
+        "DB_HOST": args.mysql_host,
+        "DB_PORT": str(args.mysql_port),
+        "DB_NAME": args.database,
+        "SECRETS_DIR": str(secrets),
+        "TLS_DIR": str(tls),
+        "PORT": str(args.port),
+        "SERVER_MODE": args.server_mode,
+    })
+    if args.workers:
+        env["WEB_WORKERS"] = args.workers
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    log = open(log_path, "w")
+    proc = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=APP_DIR, env=env,
+        stdout=log, stderr=subprocess.STDOUT, start_new_session=True,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"App exited early, see {log_path}")
+        try:
+            status, _ = request(new_conn(args), "GET", args.read_path)
+            if status == 200:
+                return proc
+        except OSError:
+            pass
+        time.sleep(0.3)
+    stop_app(proc)
+    sys.exit(f"App did not become ready, see {log_path}")
+
+
+def stop_app(proc):
+    if proc.poll() is None:
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(15)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+
+
+_SSL = ssl.create_default_context()
+_SSL.check_hostname = False
+_SSL.verify_mode = ssl.CERT_NONE
+
+
+def new_conn(args):
+    return http.client.HTTPSConnection("127.0.0.1", args.port, context=_SSL, timeout=30)
+
+
+def request(conn, method, path, body=None):
+    headers = {}
+    if body is not None:
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+    conn.request(method, path, body=body, headers=headers)
+    resp = conn.getresponse()
+    data = resp.read()
+    return resp.status, data
+
+
+# -------------------
+# Load
+# -------------------
+def worker(args, stop_at, warm_until, results, lock):
+    conn = new_conn(args)
+    rng = random.Random()
+    local = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    while time.time() < stop_at:
+        op = "write" if rng.random() < args.write_ratio else "read"
+        started = time.perf_counter()
+        try:
+            if op == "write":
+                body = urllib.parse.urlencode({
+                    "name": f"load-{rng.randint(0, 1 << 30)}",
+                    "message": "benchmark write",
+                })
+                status, _ = request(conn, "POST", "/", body)
+                ok = status in (302, 303)
+            else:
+                status, _ = request(conn, "GET", args.read_path)
+                ok = status in (200, 304)
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = new_conn(args)
+        elapsed = time.perf_counter() - started
+        if time.time() < warm_until:
+            continue
+        if ok:
+            local[op].append(elapsed)
+        else:
+            errors[op] += 1
+    conn.close()
+    with lock:
+        for op in local:
+            results[op]["latencies"].extend(local[op])
+            results[op]["errors"] += errors[op]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def summarize(latencies, errors, seconds):
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 3) if v is not None else None
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / seconds, 1) if seconds else 0,
+        "mean_ms": ms(statistics.fmean(values)) if values else None,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1]) if values else None,
+    }
+
+
+def run_load(args):
+    results = {op: {"latencies": [], "errors": 0} for op in ("read", "write")}
+    lock = threading.Lock()
+    now = time.time()
+    warm_until = now + args.warmup
+    stop_at = warm_until + args.duration
+    threads = [
+        threading.Thread(target=worker, args=(args, stop_at, warm_until, results, lock))
+        for _ in range(args.concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    summary = {op: summarize(r["latencies"], r["errors"], args.duration) for op, r in results.items()}
+    summary["total"] = summarize(
+        results["read"]["latencies"] + results["write"]["latencies"],
+        results["read"]["errors"] + results["write"]["errors"],
+        args.duration,
+    )
+    return summary
+
+
+# -------------------
+# Compare
+# -------------------
+def compare(current, baseline_path, max_regression):
+    baseline = json.loads(Path(baseline_path).read_text())
+    failed = False
+    print(f"\nComparison against {baseline_path}:")
+    for op in ("read", "write", "total"):
+        old, new = baseline["results"].get(op, {}), current["results"][op]
+        for metric, worse_if_higher in (("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+            a, b = old.get(metric), new.get(metric)
+            if not a or b is None:
+                continue
+            change = (b - a) / a * 100
+            regressed = change > max_regression if worse_if_higher else -change > max_regression
+            failed |= regressed and metric != "p99_ms"
+            flag = "  REGRESSION" if regressed else ""
+            print(f"  {op:5} {metric:15} {a:>10} -> {b:<10} ({change:+.1f}%){flag}")
+    return not failed
+
+
+def git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    args = parse_args()
+    container = None
+    if args.start_mysql:
+        container = start_mysql(args)
+    root = Path(tempfile.mkdtemp(prefix="guestbook-bench-"))
+    proc = None
+    try:
+        wait_for_mysql(args)
+        seed(args)
+        secrets, tls = make_fixtures(root, args)
+        proc = start_app(args, secrets, tls, root / "app.log")
+        before = connections_opened(args)
+        print(f"Running {args.duration:.0f}s at concurrency {args.concurrency} "
+              f"(write ratio {args.write_ratio:.0%}, mode {args.server_mode})")
+        summary = run_load(args)
+        # -1 for our own status query connection
+        opened = connections_opened(args) - before - 1
+    finally:
+        if proc is not None:
+            stop_app(proc)
+        if container:
+            subprocess.run([container[0], "stop", container[1]], stdout=subprocess.DEVNULL)
+
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_rev": git_rev(),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "write_ratio": args.write_ratio,
+            "read_path": args.read_path,
+            "seed_rows": args.seed,
+            "server_mode": args.server_mode,
+            "workers": args.workers or "auto",
+            "app_env": args.app_env,
+        },
+        "results": summary,
+        "db_connections_opened": opened,
+        "app_log": str(root / "app.log"),
+    }
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(json.dumps(report["results"], indent=2))
+    print(f"DB connections opened: {opened}")
+    print(f"Results written to {args.out}")
+
+    if args.compare and not compare(report, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -113,6 +113,16 @@ resource "kubernetes_manifest" "guestbook_db_init" {
                   message TEXT NOT NULL,
                   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
+
+                SET @has_ft := (SELECT COUNT(*) FROM information_schema.statistics
+                                WHERE table_schema = DATABASE() AND table_name = 'guestbook'
+                                  AND index_name = 'ft_name_message');
+                SET @ddl := IF(@has_ft = 0,
+                               'ALTER TABLE guestbook ADD FULLTEXT INDEX ft_name_message (name, message)',
+                               'DO 0');
+                PREPARE stmt FROM @ddl;
+                EXECUTE stmt;
+                DEALLOCATE PREPARE stmt;
                 EOSQL
                 echo "Schema applied successfully."
                 exit 0
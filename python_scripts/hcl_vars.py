@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Terraform variable definitions, parsed once and cached.
+
+Turns a module's variables.tf + terraform.tfvars into Variable records
+for import_vars.py and the ServiceNow scripts. Parsed files are cached on
+disk by content hash (HCL_CACHE_DIR, default ~/.cache/hcl_vars), so
+re-running over unchanged modules costs a hash and a small JSON read.
+
+Run directly to parse a whole tree in parallel:
+
+  python hcl_vars.py                      # app-infra, infra-config, app-deploy/*
+  python hcl_vars.py infra-platform --json
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, replace
+from typing import Any, Optional
+
+try:
+    import hcl2
+except ImportError:
+    print("Missing dependency: install with `pip install python-hcl2`")
+    sys.exit(1)
+
+# --- Config ---
+CACHE_DIR = os.environ.get("HCL_CACHE_DIR", os.path.expanduser("~/.cache/hcl_vars"))
+CACHE_VERSION = f"1/{getattr(hcl2, '__version__', '')}"
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ROOTS = ["app-infra", "infra-config", "app-deploy/*"]
+
+
+@dataclass(frozen=True)
+class Variable:
+    name: str
+    type: Optional[str] = None
+    description: str = ""
+    default: Any = None
+    sensitive: bool = False
+    nullable: bool = True
+    value: Any = None  # terraform.tfvars value, else the default
+    from_tfvars: bool = False
+
+
+# --- Normalize hcl2 output ---
+# Newer python-hcl2 releases keep the quotes around string literals and
+# wrap bare expressions in ${...}; older ones don't. Strip both so callers
+# see the same plain values whichever version is installed.
+_EXPR = re.compile(r"^\$\{(.*)\}$", re.DOTALL)
+
+
+def _plain(value):
+    if isinstance(value, str):
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            try:
+                return json.loads(value)
+            except ValueError:
+                return value[1:-1]
+        m = _EXPR.match(value)
+        return m.group(1) if m else value
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {_plain(k): _plain(v) for k, v in value.items() if k != "__is_block__"}
+    return value
+
+
+# --- Parse with on-disk cache ---
+def _cache_path(digest):
+    return os.path.join(CACHE_DIR, digest[:2], f"{digest}.json")
+
+
+def parse_file(path):
+    """Parse one HCL file into plain Python values, via the on-disk cache."""
+    with open(path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(CACHE_VERSION.encode() + b"\0" + content).hexdigest()
+    cached = _cache_path(digest)
+    try:
+        with open(cached) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    data = _plain(hcl2.loads(content.decode("utf-8")))
+    try:
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+        tmp = f"{cached}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, cached)
+    except OSError as e:
+        print(f"[hcl_vars] could not write cache for {path}: {e}", file=sys.stderr)
+    return data
+
+
+def read_variables(path):
+    """Variable records for every `variable` block in a .tf file."""
+    variables = []
+    for block in parse_file(path).get("variable", []):
+        for name, attrs in block.items():
+            variables.append(Variable(
+                name=name,
+                type=attrs.get("type"),
+                description=attrs.get("description") or "",
+                default=attrs.get("default"),
+                sensitive=bool(attrs.get("sensitive", False)),
+                nullable=attrs.get("nullable", True) is not False,
+                value=attrs.get("default"),
+            ))
+    return variables
+
+
+def read_tfvars(path):
+    if not path or not os.path.exists(path):
+        return {}
+    return parse_file(path)
+
+
+def apply_tfvars(variables, tfvars):
+    """Copies of ``variables`` with their values taken from ``tfvars``."""
+    return [replace(v, value=tfvars[v.name], from_tfvars=True) if v.name in tfvars else v
+            for v in variables]
+
+
+def load_module(directory, tfvars_name="terraform.tfvars"):
+    """Variables of one module directory, with terraform.tfvars applied."""
+    variables = read_variables(os.path.join(directory, "variables.tf"))
+    return apply_tfvars(variables, read_tfvars(os.path.join(directory, tfvars_name)))
+
+
+# --- Directory walk ---
+def find_modules(roots, base=REPO_ROOT):
+    """Directories under ``roots`` (globs, relative to ``base``) with a variables.tf."""
+    found = []
+    for pattern in roots:
+        for root in sorted(glob.glob(os.path.join(base, pattern))):
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+                if "variables.tf" in filenames:
+                    found.append(dirpath)
+    return list(dict.fromkeys(found))
+
+
+def _load_safe(directory):
+    try:
+        return load_module(directory), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def walk(roots=DEFAULT_ROOTS, base=REPO_ROOT, workers=None):
+    """Parse every module under ``roots`` in parallel.
+
+    Returns {directory: [Variable]} plus {directory: error} for modules
+    that failed to parse. Parsing is CPU-bound, so this uses processes.
+    """
+    modules = find_modules(roots, base)
+    results, errors = {}, {}
+    if not modules:
+        return results, errors
+    with ProcessPoolExecutor(max_workers=workers or min(len(modules), os.cpu_count() or 1)) as pool:
+        for directory, (variables, error) in zip(modules, pool.map(_load_safe, modules)):
+            if error:
+                errors[directory] = error
+            else:
+                results[directory] = variables
+    return results, errors
+
+
+def main():
+    p = argparse.ArgumentParser(description="Parse Terraform variables across the repo")
+    p.add_argument("roots", nargs="*", default=DEFAULT_ROOTS,
+                   help=f"directories or globs relative to --base (default: {' '.join(DEFAULT_ROOTS)})")
+    p.add_argument("--base", default=REPO_ROOT, help="repo root the roots are relative to")
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--json", action="store_true", help="print every record as JSON")
+    args = p.parse_args()
+
+    started = time.perf_counter()
+    results, errors = walk(args.roots, args.base, args.workers)
+    elapsed = time.perf_counter() - started
+    if args.json:
+        print(json.dumps({os.path.relpath(d, args.base): [asdict(v) for v in vs]
+                          for d, vs in results.items()}, indent=2, default=str))
+    else:
+        for directory, variables in results.items():
+            sensitive = sum(v.sensitive for v in variables)
+            unset = [v.name for v in variables if v.value is None]
+            print(f"{os.path.relpath(directory, args.base)}: {len(variables)} variables, "
+                  f"{sensitive} sensitive" + (f", no value: {', '.join(unset)}" if unset else ""))
+    for directory, error in errors.items():
+        print(f"{os.path.relpath(directory, args.base)}: ERROR {error}", file=sys.stderr)
+    print(f"Parsed {len(results) + len(errors)} module(s) in {elapsed:.2f}s", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
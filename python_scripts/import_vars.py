@@ -1,112 +1,176 @@
 #!/usr/bin/env python3
-import re
+import argparse
+import fnmatch
+import hashlib
+import hmac
 import json
 import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
+
 import requests
 
-try:
-    import hcl2
-except ImportError:
-    print("Missing dependency: install with `pip install python-hcl2`")
-    sys.exit(1)
+import hcl_vars
+from tfc_api import MAX_WORKERS, RATE_LIMIT, TFC_API, TFC_TOKEN, api, paginate
 
 # --- Config ---
 TFC_ORG = "ben-miles-org"  # <-- set your Terraform Cloud org here
 
-# --- Load TFC token from ~/.terraform.d/credentials.tfrc.json ---
-CRED_FILE = os.path.expanduser("~/.terraform.d/credentials.tfrc.json")
-try:
-    with open(CRED_FILE, "r") as f:
-        creds = json.load(f)
-        TFC_TOKEN = creds["credentials"]["app.terraform.io"]["token"]
-except Exception as e:
-    print(f"Error reading TFC credentials from {CRED_FILE}: {e}")
-    sys.exit(1)
-
-headers = {
-    "Authorization": f"Bearer {TFC_TOKEN}",
-    "Content-Type": "application/vnd.api+json"
-}
-
 # --- Args ---
-if len(sys.argv) < 3:
-    print(f"Usage: {sys.argv[0]} <variables.tf> <workspace-name> [--overwrite] [terraform.tfvars]")
-    sys.exit(1)
+def parse_args():
+    p = argparse.ArgumentParser(
+        description="Push variables.tf (+ terraform.tfvars values) to Terraform Cloud workspaces",
+        usage="%(prog)s <variables.tf> <workspace-name> [--overwrite] [--plan] [terraform.tfvars]\n"
+              "       %(prog)s <variables.tf> --manifest workspaces.json [--overwrite]\n"
+              "       %(prog)s <variables.tf> --workspaces 'tenant-*' [--tfvars FILE] [--overwrite]",
+    )
+    p.add_argument("vars_file", metavar="variables.tf")
+    p.add_argument("workspace", nargs="?", help="single workspace name")
+    p.add_argument("tfvars", nargs="?", help="terraform.tfvars for the single workspace")
+    p.add_argument("--overwrite", action="store_true", help="update variables that already exist")
+    p.add_argument("--plan", action="store_true", help="print the changes without making them")
+    p.add_argument("--manifest", help='JSON object mapping workspace name -> tfvars path (or null)')
+    p.add_argument("--workspaces", metavar="PATTERN",
+                   help="every workspace in the org whose name matches this glob")
+    p.add_argument("--tfvars", dest="tfvars_opt", help="tfvars applied to every --workspaces match")
+    # intermixed: the original usage puts terraform.tfvars after --overwrite
+    args = p.parse_intermixed_args()
+    modes = sum(bool(x) for x in (args.workspace, args.manifest, args.workspaces))
+    if modes != 1:
+        p.error("give exactly one of <workspace-name>, --manifest or --workspaces")
+    if args.tfvars and not args.workspace:
+        p.error("positional terraform.tfvars only goes with <workspace-name>; use --tfvars")
+    return args
 
-vars_file = sys.argv[1]
-workspace_name = sys.argv[2]
-overwrite = "--overwrite" in sys.argv
-tfvars_file = None
-
-for arg in sys.argv[3:]:
-    if arg != "--overwrite":
-        tfvars_file = arg
 
 # --- Step 1: Parse variables.tf ---
-with open(vars_file, "r") as f:
-    content = f.read()
-
-pattern = re.compile(r'variable\s+"(?P<name>[^"]+)"\s*{([^}]*)}', re.DOTALL)
-variables = []
-for match in pattern.finditer(content):
-    name = match.group("name")
-    block = match.group(2)
-
-    desc_match = re.search(r'description\s*=\s*"([^"]*)"', block)
-    default_match = re.search(r'default\s*=\s*("?[^"\n]+?")', block)
-    sens_match = re.search(r'sensitive\s*=\s*(true|false)', block, re.IGNORECASE)
-
-    var_info = {
-        "name": name,
-        "description": desc_match.group(1) if desc_match else "",
-        "default": default_match.group(1).strip('"') if default_match else "",
-        "sensitive": sens_match and sens_match.group(1).lower() == "true",
-        "value": None  # placeholder for tfvars
-    }
-    variables.append(var_info)
-
-# --- Step 2: Parse terraform.tfvars if provided ---
-tfvars_data = {}
-if tfvars_file and os.path.exists(tfvars_file):
-    with open(tfvars_file, "r") as f:
-        tfvars_data = hcl2.load(f)
-        print(f"Loaded tfvars: {tfvars_data}")
-
-# --- Merge tfvars values ---
-for v in variables:
-    if v["name"] in tfvars_data:
-        v["value"] = tfvars_data[v["name"]]
-    elif v["default"]:
-        v["value"] = v["default"]
-    else:
-        v["value"] = ""
+# hcl_vars parses with python-hcl2 (nested blocks such as validation {}
+# included) and caches the result on disk by file content.
+parse_variables = hcl_vars.read_variables
+
+
+# --- Step 2: Parse terraform.tfvars and merge values ---
+_tfvars_cache = {}
 
-print("Final variables to push:")
-for v in variables:
-    print(f"- {v['name']}: {v['value']} (sensitive={v['sensitive']})")
+def load_tfvars(tfvars_file):
+    if not tfvars_file or not os.path.exists(tfvars_file):
+        return {}
+    path = os.path.abspath(tfvars_file)
+    if path not in _tfvars_cache:
+        _tfvars_cache[path] = hcl_vars.read_tfvars(path)
+        print(f"Loaded tfvars from {tfvars_file}: {_tfvars_cache[path]}")
+    return _tfvars_cache[path]
 
-# --- Step 3: Get workspace ID ---
-org_url = f"https://app.terraform.io/api/v2/organizations/{TFC_ORG}/workspaces/{workspace_name}"
-resp = requests.get(org_url, headers=headers)
-if resp.status_code != 200:
-    print(f"Error fetching workspace: {resp.text}")
-    sys.exit(1)
 
-workspace_id = resp.json()["data"]["id"]
+def merge_values(variables, tfvars_data):
+    return [v if v.value is not None else replace(v, value="")
+            for v in hcl_vars.apply_tfvars(variables, tfvars_data)]
+
+
+# --- Step 3: Resolve workspace IDs ---
+def get_workspace_id(name):
+    resp = api("GET", f"{TFC_API}/organizations/{TFC_ORG}/workspaces/{name}")
+    if resp.status_code != 200:
+        raise RuntimeError(f"Error fetching workspace {name}: {resp.text}")
+    return resp.json()["data"]["id"]
+
+
+def list_workspaces():
+    """Yield (name, id) for every workspace in the org."""
+    for ws in paginate(f"{TFC_API}/organizations/{TFC_ORG}/workspaces"):
+        yield ws["attributes"]["name"], ws["id"]
+
+
+def resolve_targets(args):
+    """[(workspace name, workspace id, tfvars path)] for the chosen mode."""
+    if args.workspace:
+        return [(args.workspace, get_workspace_id(args.workspace), args.tfvars)]
+    if args.manifest:
+        with open(args.manifest) as f:
+            manifest = json.load(f)
+        base = os.path.dirname(os.path.abspath(args.manifest))
+        wanted = {name: (os.path.join(base, path) if path else None)
+                  for name, path in manifest.items()}
+    else:
+        wanted = None
+    # One paged listing instead of a lookup per workspace, keeping only
+    # the workspaces we were asked for.
+    if wanted is None:
+        org_workspaces = {name: ws_id for name, ws_id in list_workspaces()
+                          if fnmatch.fnmatch(name, args.workspaces)}
+        names = sorted(org_workspaces)
+        if not names:
+            raise RuntimeError(f"No workspaces in {TFC_ORG} match {args.workspaces!r}")
+        return [(name, org_workspaces[name], args.tfvars_opt) for name in names]
+    org_workspaces = {name: ws_id for name, ws_id in list_workspaces() if name in wanted}
+    missing = sorted(set(wanted) - set(org_workspaces))
+    if missing:
+        raise RuntimeError(f"Workspaces not found in {TFC_ORG}: {', '.join(missing)}")
+    return [(name, org_workspaces[name], path) for name, path in wanted.items()]
+
 
 # --- Step 4: Get existing vars ---
-vars_url = f"https://app.terraform.io/api/v2/workspaces/{workspace_id}/vars"
-resp = requests.get(vars_url, headers=headers)
-if resp.status_code != 200:
-    print(f"Error fetching existing vars: {resp.text}")
-    sys.exit(1)
+def get_existing_vars(workspace_id):
+    # Every page: a key missed on page 2+ would be POSTed again and fail.
+    return {v["attributes"]["key"]: v
+            for v in paginate(f"{TFC_API}/workspaces/{workspace_id}/vars")}
+
+
+# --- Step 5: Plan changes ---
+HASH_CACHE_FILE = os.path.expanduser("~/.terraform.d/import_vars_hashes.json")
+
+
+class HashCache:
+    """Keyed hashes of the sensitive values this script has written.
+
+    TFC never returns sensitive values, so the only way to tell whether one
+    changed is to compare with what we wrote last time. Entries are
+    HMAC-SHA256 keyed with the TFC token, so the file reveals nothing
+    without it (and is simply rebuilt after the token rotates).
+    """
+
+    def __init__(self, path, secret):
+        self.path = path
+        self._secret = secret.encode()
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(path) as f:
+                self._hashes = json.load(f)
+        except (OSError, ValueError):
+            self._hashes = {}
 
-existing_vars = {v["attributes"]["key"]: v for v in resp.json()["data"]}
+    def _digest(self, workspace_id, key, value):
+        msg = f"{workspace_id}/{key}\0{value}".encode()
+        return hmac.new(self._secret, msg, hashlib.sha256).hexdigest()
 
-# --- Step 5: Upload or update vars ---
-for v in variables:
-    value = v["value"]
+    def matches(self, workspace_id, key, value):
+        """True/False if we know what is stored, None if we don't."""
+        known = self._hashes.get(f"{workspace_id}/{key}")
+        if known is None:
+            return None
+        return hmac.compare_digest(known, self._digest(workspace_id, key, value))
+
+    def remember(self, workspace_id, key, value):
+        with self._lock:
+            self._hashes[f"{workspace_id}/{key}"] = self._digest(workspace_id, key, value)
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp = f"{self.path}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(self._hashes, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+def desired_attrs(v):
+    value = v.value
 
     # Normalize booleans
     if isinstance(value, bool):
@@ -118,41 +182,226 @@ for v in variables:
         value = json.dumps(value)
         hcl_flag = True
 
-    attrs = {
-        "key": v["name"],
+    return {
+        "key": v.name,
         "value": str(value),
-        "description": v["description"],
+        "description": v.description,
         "category": "terraform",
         "hcl": hcl_flag,
+        "sensitive": v.sensitive,
     }
 
-    if v["sensitive"]:
-        attrs["sensitive"] = True
 
+def plan_variable(v, workspace_id, existing_vars, overwrite, hashes):
+    """Work out the smallest write that brings one variable up to date.
+
+    Returns a dict with "action" (create, update, unchanged or skip),
+    "fields" (what differs) and "attrs" (what to send).
+    """
+    attrs = desired_attrs(v)
+    change = {"key": attrs["key"], "workspace_id": workspace_id,
+              "sensitive": attrs["sensitive"], "note": None}
+    current = existing_vars.get(attrs["key"])
+    if current is None:
+        return dict(change, action="create", fields=["value"], attrs=attrs)
+
+    old = current["attributes"]
+    change["var_id"] = current["id"]
+    fields = [f for f in ("description", "hcl", "sensitive")
+              if (old.get(f) or type(attrs[f])()) != attrs[f]]
+    if old.get("sensitive"):
+        known = hashes.matches(workspace_id, attrs["key"], attrs["value"])
+        if not known:
+            fields.append("value")
+            if known is None:
+                change["note"] = "not in local hash cache"
+    elif (old.get("value") or "") != attrs["value"]:
+        fields.append("value")
+        change["old_value"] = old.get("value") or ""
 
-    payload = {
-        "data": {
-            "type": "vars",
-            "attributes": attrs,
-            "relationships": {
-                "workspace": {"data": {"type": "workspaces", "id": workspace_id}}
-            }
+    change.update(fields=fields, attrs={f: attrs[f] for f in fields})
+    if not fields:
+        return dict(change, action="unchanged")
+    if old.get("sensitive") and not attrs["sensitive"]:
+        return dict(change, action="skip", note="sensitive can't be unset, delete it first")
+    if not overwrite:
+        return dict(change, action="skip", note="use --overwrite to update")
+    return dict(change, action="update")
+
+
+def _short(value, limit=40):
+    value = json.dumps(value)
+    return value if len(value) <= limit else value[:limit - 4] + '..."'
+
+
+def print_plan(ws, changes):
+    unchanged = 0
+    print(f"\n[{ws}] plan:")
+    for c in sorted(changes, key=lambda c: c["key"]):
+        if c["action"] == "unchanged":
+            unchanged += 1
+            continue
+        if c["action"] == "create":
+            print(f"  + {c['key']}" + (" (sensitive)" if c["sensitive"] else ""))
+            continue
+        details = []
+        for f in c["fields"]:
+            if f != "value":
+                details.append(f"{f}: {_short(c['attrs'][f])}")
+            elif c["sensitive"] or "old_value" not in c:
+                details.append("value: (sensitive)")
+            else:
+                details.append(f"value: {_short(c['old_value'])} -> {_short(c['attrs']['value'])}")
+        if c["note"]:
+            details.append(c["note"])
+        print(f"  {'~' if c['action'] == 'update' else '!'} {c['key']}: {'; '.join(details)}")
+    print(f"  = {unchanged} unchanged")
+
+
+def plan_all(targets, variables, overwrite, hashes):
+    """Fetch existing vars for every target concurrently and plan each one.
+
+    Returns ({workspace: [change]}, {workspace: result}).
+    """
+    results = {name: new_result() for name, _, _ in targets}
+    plans = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        listed = {pool.submit(get_existing_vars, ws_id): (name, ws_id, tfvars)
+                  for name, ws_id, tfvars in targets}
+        for future in as_completed(listed):
+            name, ws_id, tfvars = listed[future]
+            try:
+                existing_vars = future.result()
+                wanted = merge_values(variables, load_tfvars(tfvars))
+            except Exception as e:
+                results[name]["error"] = str(e)
+                print(f"[{name}] {e}")
+                continue
+            plans[name] = [plan_variable(v, ws_id, existing_vars, overwrite, hashes)
+                           for v in wanted]
+    return plans, results
+
+
+# --- Step 6: Apply the plan ---
+def apply_change(change, hashes):
+    """Send one planned write. Returns (action, seconds, error)."""
+    started = time.perf_counter()
+    payload = {"data": {"type": "vars", "attributes": change["attrs"]}}
+    if change["action"] == "create":
+        payload["data"]["relationships"] = {
+            "workspace": {"data": {"type": "workspaces", "id": change["workspace_id"]}}
         }
-    }
+        action, r = "added", api("POST", f"{TFC_API}/vars", json=payload)
+    else:
+        # Only the attributes that differ go in the PATCH.
+        payload["data"]["id"] = change["var_id"]
+        action, r = "updated", api("PATCH", f"{TFC_API}/vars/{change['var_id']}", json=payload)
+    if r.status_code not in [200, 201]:
+        return "failed", time.perf_counter() - started, f"{r.status_code} {r.text}"
+    if "value" in change["attrs"] and change["sensitive"]:
+        hashes.remember(change["workspace_id"], change["key"], change["attrs"]["value"])
+    return action, time.perf_counter() - started, None
+
 
-    if v["name"] in existing_vars:
-        var_id = existing_vars[v["name"]]["id"]
-        if overwrite:
-            r = requests.patch(f"https://app.terraform.io/api/v2/vars/{var_id}", headers=headers, json=payload)
-            if r.status_code in [200, 201]:
-                print(f"Updated {v['name']}")
+def new_result():
+    return {"added": [], "updated": [], "unchanged": [], "skipped": [], "failed": [],
+            "timings": [], "error": None}
+
+
+def apply_all(plans, results, hashes, verbose):
+    """Send every create and update on one shared pool."""
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {}
+        for ws, changes in plans.items():
+            for c in changes:
+                if c["action"] == "unchanged":
+                    results[ws]["unchanged"].append(c["key"])
+                elif c["action"] == "skip":
+                    results[ws]["skipped"].append(c["key"])
+                else:
+                    futures[pool.submit(apply_change, c, hashes)] = (ws, c["key"])
+
+        for future in as_completed(futures):
+            ws, var = futures[future]
+            try:
+                action, seconds, error = future.result()
+            except requests.RequestException as e:
+                action, seconds, error = "failed", 0.0, str(e)
+            results[ws][action].append(var)
+            if seconds:
+                results[ws]["timings"].append(seconds)
+            prefix = f"[{ws}] " if verbose else ""
+            if action == "added":
+                print(f"{prefix}✔ Added {var}")
+            elif action == "updated":
+                print(f"{prefix}Updated {var}")
             else:
-                print(f"Failed to update {v['name']}: {r.text}")
-        else:
-            print(f"Skipped {v['name']} (already exists, use --overwrite to update)")
+                print(f"{prefix}Failed to push {var}: {error}")
+    return results
+
+
+# --- Summary ---
+def print_summary(results, elapsed, variable_count):
+    print(f"\nSummary: {variable_count} variables x {len(results)} workspace(s) in {elapsed:.1f}s "
+          f"({MAX_WORKERS} workers, {RATE_LIMIT:g} req/s limit)")
+    width = max(len(name) for name in results)
+    print(f"  {'workspace':{width}}  added  updated  unchanged  skipped  failed  avg-s  max-s")
+    failed = False
+    for name in sorted(results):
+        r = results[name]
+        if r["error"]:
+            failed = True
+            print(f"  {name:{width}}  ERROR: {r['error']}")
+            continue
+        t = sorted(r["timings"])
+        avg = sum(t) / len(t) if t else 0.0
+        print(f"  {name:{width}}  {len(r['added']):5}  {len(r['updated']):7}  "
+              f"{len(r['unchanged']):9}  {len(r['skipped']):7}  {len(r['failed']):6}  {avg:5.2f}  {t[-1] if t else 0.0:5.2f}")
+        if r["failed"]:
+            failed = True
+            print(f"  {'':{width}}  failed: {', '.join(sorted(r['failed']))}")
+    return failed
+
+
+def main():
+    args = parse_args()
+    variables = parse_variables(args.vars_file)
+    try:
+        targets = resolve_targets(args)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+
+    if args.workspace:
+        print("Final variables to push:")
+        for v in merge_values(variables, load_tfvars(args.tfvars)):
+            print(f"- {v.name}: {v.value} (sensitive={v.sensitive})")
     else:
-        r = requests.post("https://app.terraform.io/api/v2/vars", headers=headers, json=payload)
-        if r.status_code in [200, 201]:
-            print(f"✔ Added {v['name']}")
-        else:
-            print(f"Failed to add {v['name']}: {r.text}")
+        print(f"Pushing {len(variables)} variables to {len(targets)} workspaces:")
+        for name, _, tfvars in targets:
+            print(f"- {name}" + (f" (tfvars: {tfvars})" if tfvars else ""))
+
+    # Parse every tfvars file once, before the clock starts.
+    for _, _, tfvars in targets:
+        load_tfvars(tfvars)
+
+    hashes = HashCache(HASH_CACHE_FILE, TFC_TOKEN)
+    started = time.perf_counter()
+    plans, results = plan_all(targets, variables, args.overwrite, hashes)
+    for ws in sorted(plans):
+        print_plan(ws, plans[ws])
+    if args.plan:
+        writes = sum(c["action"] in ("create", "update") for cs in plans.values() for c in cs)
+        print(f"\nPlan only: {writes} write(s) would be sent. Re-run without --plan to apply.")
+        return
+
+    try:
+        apply_all(plans, results, hashes, verbose=len(targets) > 1)
+    finally:
+        hashes.save()
+    if print_summary(results, time.perf_counter() - started, len(variables)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
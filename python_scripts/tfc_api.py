@@ -0,0 +1,156 @@
+"""Terraform Cloud API client shared by the scripts in this directory.
+
+One keep-alive session, a process-wide rate limit, retries that honour
+Retry-After, and ``paginate()`` for the JSON:API list endpoints.
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Config ---
+TFC_API = "https://app.terraform.io/api/v2"
+MAX_WORKERS = int(os.environ.get("TFC_MAX_WORKERS", "8"))  # concurrent API calls
+MAX_RETRIES = int(os.environ.get("TFC_MAX_RETRIES", "5"))
+RATE_LIMIT = float(os.environ.get("TFC_RATE_LIMIT", "25"))  # requests/s, all workers together
+PAGE_SIZE = 100  # the API's maximum page[size]
+
+# --- Load TFC token from ~/.terraform.d/credentials.tfrc.json ---
+CRED_FILE = os.path.expanduser("~/.terraform.d/credentials.tfrc.json")
+try:
+    with open(CRED_FILE, "r") as f:
+        creds = json.load(f)
+        TFC_TOKEN = creds["credentials"]["app.terraform.io"]["token"]
+except Exception as e:
+    print(f"Error reading TFC credentials from {CRED_FILE}: {e}")
+    sys.exit(1)
+
+headers = {
+    "Authorization": f"Bearer {TFC_TOKEN}",
+    "Content-Type": "application/vnd.api+json"
+}
+
+# One keep-alive session shared by all workers, with a connection per worker.
+session = requests.Session()
+session.headers.update(headers)
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS))
+
+
+class RateLimiter:
+    """Spaces calls out to at most ``rate`` per second across all threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+rate_limiter = RateLimiter(RATE_LIMIT)
+
+
+def retry_delay(resp, attempt):
+    """Seconds to wait before retrying: Retry-After if given, else backoff."""
+    header = resp.headers.get("Retry-After") if resp is not None else None
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    return min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def api(method, url, **kwargs):
+    """session.request() that retries rate limits, 5xx and dropped connections.
+
+    429 is always retried. Other errors are only retried for GET/PATCH so a
+    POST that may have gone through is never sent twice.
+    """
+    idempotent = method in ("GET", "PATCH")
+    for attempt in range(MAX_RETRIES + 1):
+        rate_limiter.wait()
+        try:
+            resp = session.request(method, url, timeout=30, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if not idempotent or attempt == MAX_RETRIES:
+                raise
+            resp = None
+        else:
+            retryable = resp.status_code == 429 or (idempotent and resp.status_code >= 500)
+            if not retryable or attempt == MAX_RETRIES:
+                return resp
+        delay = retry_delay(resp, attempt)
+        status = resp.status_code if resp is not None else "connection error"
+        print(f"  {method} {url}: {status}, retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+
+# --- Pagination ---
+def _get_page(url, params, number, page_size):
+    resp = api("GET", url, params=dict(params, **{"page[number]": number, "page[size]": page_size}))
+    if resp.status_code != 200:
+        raise RuntimeError(f"Error listing {url} (page {number}): {resp.status_code} {resp.text}")
+    body = resp.json()
+    return body["data"], body.get("meta", {}).get("pagination") or {}
+
+
+def paginate(url, params=None, page_size=PAGE_SIZE, workers=MAX_WORKERS):
+    """Yield every record of a JSON:API list endpoint, in order.
+
+    The first page's meta.pagination gives total-pages; the rest are then
+    fetched concurrently, at most ``workers`` ahead of the caller, so
+    memory stays at a few pages however long the list is. Endpoints that
+    only report next-page are followed one page at a time.
+    """
+    params = dict(params or {})
+    records, meta = _get_page(url, params, 1, page_size)
+    yield from records
+
+    total = meta.get("total-pages")
+    if total is None:
+        next_page = meta.get("next-page")
+        while next_page:
+            records, meta = _get_page(url, params, next_page, page_size)
+            yield from records
+            next_page = meta.get("next-page")
+        return
+    if total <= 1:
+        return
+
+    pool = ThreadPoolExecutor(max_workers=max(1, min(workers, total - 1)))
+    pending = deque()
+    pages = iter(range(2, total + 1))
+    try:
+        for number in pages:
+            pending.append(pool.submit(_get_page, url, params, number, page_size))
+            if len(pending) >= workers:
+                break
+        while pending:
+            records, _ = pending.popleft().result()
+            for number in pages:
+                pending.append(pool.submit(_get_page, url, params, number, page_size))
+                break
+            yield from records
+    finally:
+        # Also runs if the caller stops early: drop the pages not yet sent.
+        pool.shutdown(wait=True, cancel_futures=True)
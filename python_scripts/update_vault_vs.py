@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
-import os
 import sys
-import json
-import requests
+
+from tfc_api import TFC_API, api, paginate
 
 # --- Config ---
 TFC_ORG = "ben-miles-org"
@@ -15,21 +14,12 @@ if len(sys.argv) < 2:
 
 NEW_VALUE = sys.argv[1]
 
-# --- Load Terraform Cloud token ---
-CRED_FILE = os.path.expanduser("~/.terraform.d/credentials.tfrc.json")
-with open(CRED_FILE, "r") as f:
-    creds = json.load(f)
-    TFC_TOKEN = creds["credentials"]["app.terraform.io"]["token"]
-
-headers = {
-    "Authorization": f"Bearer {TFC_TOKEN}",
-    "Content-Type": "application/vnd.api+json"
-}
-
-# --- Get current vars in varset ---
-resp = requests.get(f"https://app.terraform.io/api/v2/varsets/{VARSET_ID}/relationships/vars", headers=headers)
-resp.raise_for_status()
-existing_vars = {v["attributes"]["key"]: v for v in resp.json()["data"]}
+# --- Find the var in the varset (every page, stopping once found) ---
+existing = next(
+    (v for v in paginate(f"{TFC_API}/varsets/{VARSET_ID}/relationships/vars")
+     if v["attributes"]["key"] == VAR_KEY),
+    None
+)
 
 payload = {
     "data": {
@@ -48,11 +38,10 @@ payload = {
 }
 
 # --- Update or create ---
-if VAR_KEY in existing_vars:
-    var_id = existing_vars[VAR_KEY]["id"]
-    r = requests.patch(f"https://app.terraform.io/api/v2/vars/{var_id}", headers=headers, json=payload)
+if existing:
+    r = api("PATCH", f"{TFC_API}/vars/{existing['id']}", json=payload)
 else:
-    r = requests.post("https://app.terraform.io/api/v2/vars", headers=headers, json=payload)
+    r = api("POST", f"{TFC_API}/vars", json=payload)
 
 if r.status_code in [200, 201]:
     print(f"Updated '{VAR_KEY}' in variable set {VARSET_ID}")